@@ -1,35 +1,446 @@
+import base64
+import hashlib
+import io
 import json
 import psycopg2
+import psycopg2.extras
+import re
 import time
+from typing import Iterator
 
-from chain_types import Block, Tx
+from chain_types import Block, BlockData, Message, Tx
 from util import txraw_to_hash
 
+try:
+    # optional, only needed for AsyncDatabase (pip install asyncpg)
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+TX_COLUMNS = ["id", "height", "tx_amino", "msg_types", "tx_json", "address", "tx_hash"]
+# what get_tx & co load, tx_amino is fetched on access (Tx.tx_amino)
+TX_HOT_COLUMNS = [c for c in TX_COLUMNS if c != "tx_amino"]
+BLOCK_COLUMNS = ["height", "time", "txs"]
+# blocks are COPYed here first, so a height saved by another worker or an earlier run is skipped
+# (ON CONFLICT) instead of failing the whole COPY
+BLOCKS_STAGING_DDL = """CREATE TEMP TABLE IF NOT EXISTS blocks_staging (height INTEGER, time TEXT, txs INTEGER[])"""
+BLOCKS_FROM_STAGING = f"""INSERT INTO blocks ({','.join(BLOCK_COLUMNS)}) SELECT {','.join(BLOCK_COLUMNS)} FROM blocks_staging ON CONFLICT (height) DO NOTHING RETURNING height"""
+BLOCK_TXS_TYPE_QUERY = """SELECT data_type FROM information_schema.columns WHERE table_schema = 'public' AND table_name = 'blocks' AND column_name = 'txs'"""
+# txs.tx_amino & tx_hash are TEXT (base64 / uppercase hex) or, in bytea mode, the raw bytes & 32 byte digest
+RAW_MODE_QUERY = """SELECT data_type FROM information_schema.columns WHERE table_schema = 'public' AND table_name = 'txs' AND column_name = 'tx_amino'"""
+# txs.tx_json & msg_types are TEXT ('' until decoded) or, in jsonb mode, JSONB (NULL until decoded)
+JSON_MODE_QUERY = """SELECT data_type FROM information_schema.columns WHERE table_schema = 'public' AND table_name = 'txs' AND column_name = 'tx_json'"""
+# blocks & txs are optionally range partitioned by height, one <table>_p<first height> per partition
+PARTITIONED_TABLES = ["blocks", "txs"]
+PARTITIONED_QUERY = """SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('public.txs')"""
+PARTITION_BOUNDS_QUERY = """SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'public.blocks'::regclass"""
+PARTITION_BOUND = re.compile(r"FROM \('?(-?\d+)'?\) TO \('?(-?\d+)'?\)")
+# indexes of older versions: blocks_height duplicates the primary key & txs_data_index
+# (id, height, address, tx_hash) could not serve hash or address lookups
+LEGACY_INDEXES = ["blocks_height", "txs_data_index"]
+# a \u0000 escape which is not itself escaped (an even run of backslashes before it), same
+# syntax for python re & postgres regexp_replace
+NUL_ESCAPE_PATTERN = r"(?<!\\)((?:\\\\)*)\\u0000"
+NUL_ESCAPE = re.compile(NUL_ESCAPE_PATTERN)
+MESSAGE_COLUMNS = ["tx_id", "height", "msg_index", "parent_index", "type_id", "sender", "contract", "addresses", "payload"]
+
+
+def _copy_value(value) -> str:
+    # COPY ... FROM STDIN text format: tab separated, backslash escaped.
+    if value is None:
+        return "\\N"
+    if isinstance(value, (bytes, memoryview)):
+        # bytea hex format, the backslash itself escaped for COPY
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, list):
+        # INTEGER[] / TEXT[] literal, text elements quoted. Then escaped for COPY like any text
+        items = (str(v) if isinstance(v, int) else '"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in value)
+        value = "{" + ",".join(items) + "}"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def partition_bounds(height: int, partition_size: int) -> tuple[int, int]:
+    """[start, end) heights of the partition holding height"""
+    start = height // partition_size * partition_size
+    return start, start + partition_size
+
+
+def resolve_partition_size(bounds: list[str], configured: int) -> int:
+    """
+    Heights per partition of the already partitioned blocks & txs, read from the bounds of the
+    attached blocks partitions. configured (PARTITION_SIZE) is only used while there are none.
+    Raises ValueError if it does not match them, or they do not share one aligned size.
+    """
+    ranges = [tuple(map(int, m.groups())) for m in map(PARTITION_BOUND.search, bounds) if m is not None]
+    if len(ranges) == 0:
+        if configured <= 0:
+            raise ValueError("blocks & txs are partitioned by height but PARTITION_SIZE is not set")
+        return configured
+
+    sizes = {end - start for start, end in ranges}
+    size = min(sizes)
+    if len(sizes) > 1 or any(start % size for start, _ in ranges):
+        raise ValueError(f"blocks partitions do not share one aligned size ({', '.join(map(str, sorted(sizes)))} heights), fix them with scripts/manage_partitions.py")
+    if configured > 0 and configured != size:
+        raise ValueError(f"PARTITION_SIZE is {configured:,} but the existing blocks & txs partitions hold {size:,} heights each, set it to {size} or 0")
+    return size
+
+
+def partition_ddl(table: str, start: int, end: int) -> str:
+    return f"""CREATE TABLE IF NOT EXISTS {table}_p{start} PARTITION OF {table} FOR VALUES FROM ({start}) TO ({end})"""
+
+
+def _raw_text(column: str, value):
+    # bytea mode: callers still get the base64 tx & the uppercase hex hash, like txraw_to_hash
+    if isinstance(value, (bytes, memoryview)):
+        if column == "tx_hash":
+            return bytes(value).hex().upper()
+        return base64.b64encode(value).decode()
+    return value
+
+
+def _jsonb_text(value: str) -> str:
+    # jsonb rejects the NUL escape which TEXT columns happily store
+    return NUL_ESCAPE.sub(r"\1", value)
+
+
+def unique_blocks(values: list[BlockData]) -> list[BlockData]:
+    # one BlockData per height, a requeued height can be downloaded twice
+    return list({bd.height: bd for bd in values if bd is not None}.values())
+
+
+def only_inserted(tx_rows: list[tuple], saved: dict[int, list[int]], inserted: set[int]) -> tuple[list[tuple], dict[int, list[int]]]:
+    # drops the txs of blocks which were already saved, their reserved ids are left unused
+    return [row for row in tx_rows if row[1] in inserted], {h: ids for h, ids in saved.items() if h in inserted}
+
+
+def build_ingest_rows(values: list[BlockData], tx_ids: Iterator[int], undecoded: str | None = "", binary: bool = False) -> tuple[list[tuple], list[tuple], dict[int, list[int]]]:
+    # rows for TX_COLUMNS & BLOCK_COLUMNS, tx_ids are the reserved txs ids in order.
+    # undecoded is the msg_types / tx_json of a new tx: "" or None in jsonb mode
+    # binary stores the raw tx bytes & sha256 digest (bytea mode) instead of base64 & hex
+    tx_rows = []
+    block_rows = []
+    saved: dict[int, list[int]] = {}
+    for bd in values:
+        sql_tx_ids = []
+        for amino_tx in bd.encoded_txs:
+            tx_id = next(tx_ids)
+            if binary:
+                raw = base64.b64decode(amino_tx)
+                tx_rows.append((tx_id, bd.height, raw, undecoded, undecoded, "", hashlib.sha256(raw).digest()))
+            else:
+                tx_rows.append((tx_id, bd.height, amino_tx, undecoded, undecoded, "", txraw_to_hash(amino_tx)))
+            sql_tx_ids.append(tx_id)
+
+        block_rows.append((bd.height, bd.block_time, sql_tx_ids))
+        saved[bd.height] = sql_tx_ids
+    return tx_rows, block_rows, saved
+
+
 class Database:
     def __init__(self, dbname, user, password, host, port):
         self.conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
         self.cur = self.conn.cursor()
+        # message_types.type -> id
+        self.message_type_ids: dict[str, int] = {}
+        # heights per partition, 0 when blocks & txs are plain tables
+        self.partition_size = 0
+        self.partitions: set[int] = set()
+        # jsonb columns come back as json text like in TEXT mode: the same json, not the same string
+        # (jsonb orders object keys by length & normalizes whitespace)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=self.conn, loads=lambda x: x)
+        self.detect_storage_modes()
+
+    def detect_storage_modes(self):
+        self.cur.execute(JSON_MODE_QUERY)
+        data = self.cur.fetchone()
+        self.jsonb = data is not None and data[0] == "jsonb"
+        self.cur.execute(RAW_MODE_QUERY)
+        data = self.cur.fetchone()
+        self.binary = data is not None and data[0] == "bytea"
+        self.commit()
+
+    def _tx(self, data, columns: list[str] = TX_HOT_COLUMNS) -> Tx:
+        tx = {column: "" for column in TX_COLUMNS}
+        for column, value in zip(columns, data):
+            tx[column] = _raw_text(column, value)
+        # jsonb mode stores undecoded txs as NULL, callers see "" in both modes
+        for column in ("tx_hash", "msg_types", "tx_json"):
+            tx[column] = tx[column] or ""
+        # tx_amino is not a Tx field, None leaves it to the loader
+        raw_amino = tx.pop("tx_amino")
+        if "tx_amino" not in columns:
+            raw_amino = None
+        return Tx(raw_amino=raw_amino, loader=self.get_tx_amino, **tx)
+
+    def _tx_select(self, columns: list[str]) -> str:
+        # select list over "txs t LEFT JOIN txs_raw r", tx_amino from whichever tier holds it
+        return ",".join("COALESCE(t.tx_amino, r.tx_amino)" if c == "tx_amino" else f"t.{c}" for c in columns)
+
+    def _hash_param(self, tx_hash: str):
+        return bytes.fromhex(tx_hash) if self.binary else tx_hash
+
+    def _undecoded(self) -> str:
+        return "tx_json IS NULL" if self.jsonb else "tx_json = ''"
+
+    def _json(self, column: str) -> str:
+        # the column as jsonb in either mode, so reports run server side. In text mode through
+        # txs_jsonb, so one row jsonb rejects does not fail the whole report
+        return column if self.jsonb else f"txs_jsonb({column})"
 
     def commit(self):
         self.conn.commit()
 
-    def create_tables(self):
+    def rollback(self):
+        self.conn.rollback()
+        # ids of types inserted in the rolled back transaction are gone
+        self.message_type_ids.clear()
+
+    def create_tables(self, jsonb: bool = False, partition_size: int = 0, binary: bool = False):
+        """
+        jsonb & binary only apply to a new txs table, existing ones are converted with
+        migrate_tx_json_to_jsonb / migrate_tx_raw_to_bytea.
+        partition_size > 0 creates new blocks & txs tables range partitioned by height (the txs
+        primary key becomes (id, height)), partitions are then added by ensure_partitions.
+        """
+        json_type = "JSONB" if jsonb else "TEXT"
+        raw_type = "BYTEA" if binary else "TEXT"
+        if partition_size > 0:
+            self.cur.execute(
+                """CREATE TABLE IF NOT EXISTS blocks (height SERIAL PRIMARY KEY, time TEXT, txs INTEGER[]) PARTITION BY RANGE (height)"""
+            )
+            self.cur.execute(
+                f"""CREATE TABLE IF NOT EXISTS txs (id SERIAL, height INTEGER, tx_amino {raw_type}, msg_types {json_type}, tx_json {json_type}, address TEXT, tx_hash {raw_type}, PRIMARY KEY (id, height)) PARTITION BY RANGE (height)"""
+            )
+        else:
+            self.cur.execute(
+                """CREATE TABLE IF NOT EXISTS blocks (height SERIAL PRIMARY KEY, time TEXT, txs INTEGER[])"""
+            )
+            self.cur.execute(
+                f"""CREATE TABLE IF NOT EXISTS txs (id SERIAL PRIMARY KEY, height INTEGER, tx_amino {raw_type}, msg_types {json_type}, tx_json {json_type}, address TEXT, tx_hash {raw_type})"""
+            )
         self.cur.execute(
-            """CREATE TABLE IF NOT EXISTS blocks (height SERIAL PRIMARY KEY, time TEXT, txs TEXT)"""
+            """CREATE TABLE IF NOT EXISTS message_types (id SERIAL PRIMARY KEY, type TEXT UNIQUE)"""
         )
+        # text tx_json / msg_types as jsonb: NUL escapes stripped like _jsonb_text, NULL for '' &
+        # anything else jsonb rejects
         self.cur.execute(
-            """CREATE TABLE IF NOT EXISTS txs (id SERIAL PRIMARY KEY, height INTEGER, tx_amino TEXT, msg_types TEXT, tx_json TEXT, address TEXT, tx_hash TEXT)"""
+            f"""CREATE OR REPLACE FUNCTION txs_jsonb(value TEXT) RETURNS JSONB AS $$
+            BEGIN
+                RETURN NULLIF(regexp_replace(value, '{NUL_ESCAPE_PATTERN}', '\\1', 'g'), '')::jsonb;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql IMMUTABLE"""
         )
         self.commit()
+        self.detect_storage_modes()
+        self.migrate_blocks_txs_to_array()
+        # cold tier of tx_amino for decoded txs (archive_decoded_txs), same type as txs.tx_amino.
+        # postgres only compresses values of rows past ~2KB, so typical txs are stored as is: the
+        # gain is a txs table without them, not a smaller total. BYTEA mode is the smaller form
+        self.cur.execute(
+            f"""CREATE TABLE IF NOT EXISTS txs_raw (id INTEGER PRIMARY KEY, height INTEGER, tx_amino {"BYTEA" if self.binary else "TEXT"})"""
+        )
+        self.commit()
+
+        self.cur.execute(PARTITIONED_QUERY)
+        data = self.cur.fetchone()
+        partitioned = data is not None and data[0]
+        if partition_size > 0 and not partitioned:
+            print("blocks & txs already exist as plain tables, partitioning only applies to new databases")
+        self.partition_size = self.get_partition_size(partition_size) if partitioned else 0
+        self.cur.execute(
+            """CREATE TABLE IF NOT EXISTS messages (tx_id INTEGER, height INTEGER, msg_index INTEGER, parent_index INTEGER, type_id INTEGER, sender TEXT, contract TEXT, addresses TEXT[], payload JSONB, PRIMARY KEY (tx_id, msg_index))"""
+        )
+        # flattened authz / gov wrappers can index past SMALLINT, widen tables created with it
+        self.cur.execute(
+            """SELECT data_type FROM information_schema.columns WHERE table_schema = 'public' AND table_name = 'messages' AND column_name = 'msg_index'"""
+        )
+        data = self.cur.fetchone()
+        if data is not None and data[0] == "smallint":
+            self.cur.execute("""ALTER TABLE messages ALTER COLUMN msg_index TYPE INTEGER, ALTER COLUMN parent_index TYPE INTEGER""")
+        # messages written before addresses existed get them from the messages task
+        self.cur.execute("""ALTER TABLE messages ADD COLUMN IF NOT EXISTS addresses TEXT[]""")
+        self.commit()
+
+    def index_catalogue(self) -> dict[str, tuple[str, str]]:
+        """name -> (table, definition) of every secondary index optimize_tables maintains"""
+        indexes = {
+            # get_txs_in_range & the height range scripts
+            "txs_height": ("txs", "(height)"),
+            # get_tx_by_hash
+            "txs_tx_hash": ("txs", "(tx_hash)"),
+            # get_txs_from_address_in_range
+            "txs_address_height": ("txs", "(address, height)"),
+            # do_decode, only the undecoded txs
+            "txs_undecoded": ("txs", f"(height) WHERE {self._undecoded()}"),
+            "messages_type_height": ("messages", "(type_id, height)"),
+            "messages_sender_height": ("messages", "(sender, height)"),
+            "messages_contract_height": ("messages", "(contract, height) WHERE contract IS NOT NULL"),
+            # get_messages(address=)
+            "messages_addresses_gin": ("messages", "USING GIN (addresses)"),
+        }
+        if self.jsonb:
+            # msg_types @> '["/cosmwasm.wasm.v1.MsgExecuteContract"]' & fee denom containment
+            indexes["txs_msg_types_gin"] = ("txs", "USING GIN (msg_types jsonb_path_ops)")
+            indexes["txs_fee_amount_gin"] = ("txs", "USING GIN ((tx_json -> 'auth_info' -> 'fee' -> 'amount') jsonb_path_ops)")
+        return indexes
+
+    def optimize_tables(self, deferred_tables: tuple[str, ...] = ()):
+        """
+        Drops the legacy indexes, then builds the missing ones of index_catalogue. The indexes of
+        deferred_tables are dropped instead, so a bulk download only maintains the primary keys;
+        build_indexes puts them back once it is done.
+        """
+        for name in LEGACY_INDEXES:
+            self.cur.execute(f"""DROP INDEX IF EXISTS {name}""")
+        for name, (table, _) in self.index_catalogue().items():
+            if table in deferred_tables:
+                self.cur.execute(f"""DROP INDEX IF EXISTS {name}""")
+        self.commit()
+        self.build_indexes(skip_tables=deferred_tables)
+
+    def build_indexes(self, skip_tables: tuple[str, ...] = ()):
+        """
+        CREATE INDEX CONCURRENTLY of the missing catalogue indexes, so ingest keeps writing while
+        they build. Partitioned tables do not support it & get a plain CREATE INDEX. Indexes left
+        invalid by an interrupted concurrent build are dropped & built again.
+        """
+        catalogue = {name: v for name, v in self.index_catalogue().items() if v[0] not in skip_tables}
+        self.cur.execute(
+            """SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid AND c.relname = ANY(%s)""",
+            (list(catalogue),),
+        )
+        invalid = [x[0] for x in self.cur.fetchall()]
+        self.cur.execute("""SELECT relname FROM pg_class WHERE relkind = 'p'""")
+        partitioned = {x[0] for x in self.cur.fetchall()}
+        self.commit()
+
+        self.conn.autocommit = True
+        try:
+            for name in invalid:
+                self.cur.execute(f"""DROP INDEX IF EXISTS {name}""")
+            for name, (table, definition) in catalogue.items():
+                concurrently = "" if table in partitioned else "CONCURRENTLY "
+                self.cur.execute(f"""CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} {definition}""")
+        finally:
+            self.conn.autocommit = False
 
-    def optimize_tables(self):
+    def optimize_db(self, vacuum: bool = False):
+        """ANALYZE (VACUUM ANALYZE with vacuum) so the planner knows about bulk loaded rows"""
+        self.commit()
+        self.conn.autocommit = True
+        try:
+            self.cur.execute("""VACUUM ANALYZE""" if vacuum else """ANALYZE""")
+        finally:
+            self.conn.autocommit = False
+
+    def ensure_partitions(self, heights: list[int]):
+        """Creates the missing partitions for heights. Does not commit."""
+        if self.partition_size <= 0:
+            return
+        for start, end in sorted({partition_bounds(h, self.partition_size) for h in heights}):
+            if start in self.partitions:
+                continue
+            for table in PARTITIONED_TABLES:
+                self.cur.execute(partition_ddl(table, start, end))
+            self.partitions.add(start)
+
+    def get_partition_size(self, configured: int = 0) -> int:
+        """resolve_partition_size for the partitioned blocks & txs of this database"""
+        self.cur.execute(PARTITION_BOUNDS_QUERY)
+        return resolve_partition_size([x[0] for x in self.cur.fetchall()], configured)
+
+    def get_partitions(self) -> list[tuple[str, str]]:
+        """(name, bounds) of every attached blocks & txs partition"""
         self.cur.execute(
-            """CREATE INDEX IF NOT EXISTS blocks_height ON blocks (height)"""
+            """SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent IN ('public.blocks'::regclass, 'public.txs'::regclass) ORDER BY c.relname"""
         )
+        return self.cur.fetchall()
+
+    def detach_partition(self, start: int):
+        """
+        Detaches the blocks & txs partitions starting at height start, e.g. to archive or drop
+        cold data. The tables stay as <table>_p<start> and can be attached again.
+        """
+        for table in PARTITIONED_TABLES:
+            self.cur.execute(f"""ALTER TABLE {table} DETACH PARTITION {table}_p{start}""")
+        self.commit()
+        self.partitions.discard(start)
+
+    def attach_partition(self, start: int, partition_size: int):
+        for table in PARTITIONED_TABLES:
+            self.cur.execute(
+                f"""ALTER TABLE {table} ATTACH PARTITION {table}_p{start} FOR VALUES FROM ({start}) TO ({start + partition_size})"""
+            )
+        self.commit()
+        self.partitions.add(start)
+
+    def migrate_blocks_txs_to_array(self):
+        """
+        blocks.txs used to be a json id list in TEXT, converts it to INTEGER[] in place
+        ("[1, 2]" -> "{1, 2}"). A no-op once converted.
+        """
+        self.cur.execute(BLOCK_TXS_TYPE_QUERY)
+        data = self.cur.fetchone()
+        if data is None or data[0] != "text":
+            self.commit()
+            return
+
+        self.cur.execute("""LOCK TABLE blocks IN ACCESS EXCLUSIVE MODE""")
+        self.cur.execute(BLOCK_TXS_TYPE_QUERY)
+        data = self.cur.fetchone()
+        if data is not None and data[0] == "text":
+            print("Migrating blocks.txs to INTEGER[]...")
+            self.cur.execute(
+                """ALTER TABLE blocks ALTER COLUMN txs TYPE INTEGER[] USING translate(COALESCE(NULLIF(txs, ''), '[]'), '[]', '{}')::integer[]"""
+            )
+        self.commit()
+
+    def migrate_tx_json_to_jsonb(self):
+        """
+        Rewrites txs.tx_json & msg_types as JSONB, undecoded txs ('') become NULL. Takes an
+        exclusive lock on txs for the whole rewrite. A no-op when already migrated.
+        """
+        self.cur.execute("""LOCK TABLE txs IN ACCESS EXCLUSIVE MODE""")
+        self.cur.execute(JSON_MODE_QUERY)
+        data = self.cur.fetchone()
+        if data is not None and data[0] == "jsonb":
+            self.commit()
+            self.detect_storage_modes()
+            return
+
+        # the partial index predicate compares against '', rebuilt by optimize_tables
+        self.cur.execute("""DROP INDEX IF EXISTS txs_undecoded""")
         self.cur.execute(
-            """CREATE INDEX IF NOT EXISTS txs_data_index ON txs (id, height, address, tx_hash)"""
+            """ALTER TABLE txs
+            ALTER COLUMN tx_json TYPE JSONB USING txs_jsonb(tx_json),
+            ALTER COLUMN msg_types TYPE JSONB USING txs_jsonb(msg_types)"""
         )
         self.commit()
+        self.detect_storage_modes()
+        self.optimize_tables()
+
+    def migrate_tx_raw_to_bytea(self):
+        """
+        Rewrites txs.tx_amino as the raw tx bytes & tx_hash as the 32 byte digest. Takes an
+        exclusive lock on txs for the whole rewrite. A no-op when already migrated.
+        """
+        self.cur.execute("""LOCK TABLE txs IN ACCESS EXCLUSIVE MODE""")
+        self.cur.execute(RAW_MODE_QUERY)
+        data = self.cur.fetchone()
+        if data is None or data[0] != "bytea":
+            self.cur.execute(
+                """ALTER TABLE txs
+                ALTER COLUMN tx_amino TYPE BYTEA USING decode(tx_amino, 'base64'),
+                ALTER COLUMN tx_hash TYPE BYTEA USING decode(NULLIF(tx_hash, ''), 'hex')"""
+            )
+            self.cur.execute(
+                """ALTER TABLE txs_raw ALTER COLUMN tx_amino TYPE BYTEA USING decode(tx_amino, 'base64')"""
+            )
+        self.commit()
+        self.detect_storage_modes()
 
     def get_indexes(self):
         self.cur.execute("""SELECT indexname FROM pg_indexes WHERE schemaname = 'public';""")
@@ -43,10 +454,51 @@ class Database:
         self.cur.execute(f"""SELECT column_name, data_type FROM information_schema.columns WHERE table_name = '{table}';""")
         return self.cur.fetchall()
 
+    def copy_rows(self, table: str, columns: list[str], rows: list[tuple]):
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join(_copy_value(v) for v in row))
+            buf.write("\n")
+        buf.seek(0)
+        self.cur.copy_expert(f"""COPY {table} ({','.join(columns)}) FROM STDIN""", buf)
+
+    def reserve_tx_ids(self, amount: int) -> list[int]:
+        if amount <= 0:
+            return []
+        self.cur.execute(
+            """SELECT nextval(pg_get_serial_sequence('txs', 'id')) FROM generate_series(1, %s)""",
+            (amount,),
+        )
+        return [x[0] for x in self.cur.fetchall()]
+
+    def insert_blocks(self, values: list[BlockData]) -> dict[int, list[int]]:
+        """
+        Bulk ingest of downloaded blocks & their txs. Tx ids are reserved from the txs
+        sequence up front so both tables can be streamed in with COPY. Heights already in
+        blocks are skipped along with their txs. Does not commit, the caller owns the
+        transaction. Returns {height: [tx_id, ...]} of the inserted blocks.
+        """
+        values = unique_blocks(values)
+        if len(values) == 0:
+            return {}
+        self.ensure_partitions([bd.height for bd in values])
+        tx_ids = self.reserve_tx_ids(sum(len(bd.encoded_txs) for bd in values))
+        tx_rows, block_rows, saved = build_ingest_rows(values, iter(tx_ids), None if self.jsonb else "", self.binary)
+
+        self.cur.execute(BLOCKS_STAGING_DDL)
+        self.cur.execute("""TRUNCATE blocks_staging""")
+        self.copy_rows("blocks_staging", BLOCK_COLUMNS, block_rows)
+        self.cur.execute(BLOCKS_FROM_STAGING)
+        tx_rows, saved = only_inserted(tx_rows, saved, {x[0] for x in self.cur.fetchall()})
+
+        if tx_rows:
+            self.copy_rows("txs", TX_COLUMNS, tx_rows)
+        return saved
+
     def insert_block(self, height: int, time: str, txs_ids: list[int]):
         self.cur.execute(
             """INSERT INTO blocks (height, time, txs) VALUES (%s, %s, %s)""",
-            (height, time, json.dumps(txs_ids)),
+            (height, time, txs_ids),
         )
 
     def get_block(self, block_height: int) -> Block | None:
@@ -57,21 +509,21 @@ class Database:
         data = self.cur.fetchone()
         if data is None:
             return None
-        return Block(data[0], data[1], json.loads(data[2]))
+        return Block(data[0], data[1], list(data[2] or []))
 
     def get_earliest_block(self) -> Block | None:
         self.cur.execute("""SELECT * FROM blocks ORDER BY height ASC LIMIT 1""")
         data = self.cur.fetchone()
         if data is None:
             return None
-        return Block(data[0], data[1], json.loads(data[2]))
+        return Block(data[0], data[1], list(data[2] or []))
 
     def get_latest_saved_block(self) -> Block | None:
         self.cur.execute("""SELECT * FROM blocks ORDER BY height DESC LIMIT 1""")
         data = self.cur.fetchone()
         if data is None:
             return None
-        return Block(data[0], data[1], json.loads(data[2]))
+        return Block(data[0], data[1], list(data[2] or []))
 
     def get_total_blocks(self) -> int:
         self.cur.execute("""SELECT COUNT(*) FROM blocks""")
@@ -80,46 +532,77 @@ class Database:
             return 0
         return data[0]
 
+    def get_saved_heights(self, start_height: int, end_height: int) -> bytearray:
+        """
+        Bitmap of the saved blocks in a range, saved[height - start_height] == 1.
+        One indexed query streamed through a server side cursor, so it is cheap even
+        over millions of heights.
+        """
+        saved = bytearray(max(end_height - start_height + 1, 0))
+        with self.conn.cursor(name="saved_heights") as cur:
+            cur.itersize = 100_000
+            cur.execute(
+                """SELECT height FROM blocks WHERE height BETWEEN %s AND %s""",
+                (start_height, end_height),
+            )
+            for (height,) in cur:
+                saved[height - start_height] = 1
+        return saved
+
     def get_missing_blocks(self, start_height, end_height) -> list[int]:
-        self.cur.execute(
-            """SELECT height FROM blocks WHERE height BETWEEN %s AND %s""",
-            (start_height, end_height),
-        )
-        data = self.cur.fetchall()
-        if data is None:
-            return list(range(start_height, end_height + 1))
-        found_heights = set(x[0] for x in data)
-        missing_heights = [
-            height
-            for height in range(start_height, end_height + 1)
-            if height not in found_heights
-        ]
-        return missing_heights
+        saved = self.get_saved_heights(start_height, end_height)
+        return [start_height + i for i, is_saved in enumerate(saved) if not is_saved]
 
     def insert_tx(self, height: int, tx_amino: str):
         tx_hash = txraw_to_hash(tx_amino)
+        undecoded = None if self.jsonb else ""
+        if self.binary:
+            tx_amino = base64.b64decode(tx_amino)
+            tx_hash = bytes.fromhex(tx_hash)
         self.cur.execute(
-            """INSERT INTO txs (height, tx_amino, msg_types, tx_json, address, tx_hash) VALUES (%s, %s, %s, %s, %s, %s)""",
-            (height, tx_amino, "", "", "", tx_hash),
+            """INSERT INTO txs (height, tx_amino, msg_types, tx_json, address, tx_hash) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id""",
+            (height, tx_amino, undecoded, undecoded, "", tx_hash),
         )
-        return self.cur.lastrowid
+        return self.cur.fetchone()[0]
 
     def update_tx(self, _id: int, tx_json: str, msg_types: str, address: str):
+        if self.jsonb:
+            tx_json = _jsonb_text(tx_json)
         self.cur.execute(
             """UPDATE txs SET tx_json=%s, msg_types=%s, address=%s WHERE id=%s""",
             (tx_json, msg_types, address, _id),
         )
 
+    def update_txs(self, rows: list[tuple[int, int, str, str, str]]):
+        """
+        Bulk update_tx. rows of (id, height, tx_json, msg_types, address) are COPYd into a session
+        temp table and applied with a single UPDATE ... FROM, the height prunes it to one partition
+        per row when txs is partitioned. Does not commit.
+        """
+        if len(rows) == 0:
+            return
+        self.cur.execute(
+            """CREATE TEMP TABLE IF NOT EXISTS txs_decoded (id INTEGER PRIMARY KEY, height INTEGER, tx_json TEXT, msg_types TEXT, address TEXT) ON COMMIT DELETE ROWS"""
+        )
+        cast = ""
+        if self.jsonb:
+            rows = [(r[0], r[1], _jsonb_text(r[2]), r[3], r[4]) for r in rows]
+            cast = "::jsonb"
+        self.copy_rows("txs_decoded", ["id", "height", "tx_json", "msg_types", "address"], rows)
+        self.cur.execute(
+            f"""UPDATE txs SET tx_json=d.tx_json{cast}, msg_types=d.msg_types{cast}, address=d.address FROM txs_decoded d WHERE txs.id = d.id AND txs.height = d.height"""
+        )
+
     def update_tx_hash(self, _id: int, tx_hash: str):
         self.cur.execute(
             """UPDATE txs SET tx_hash=%s WHERE id=%s""",
-            (tx_hash, _id),
+            (self._hash_param(tx_hash), _id),
         )
 
     def get_tx_by_hash(self, tx_hash: str) -> Tx | None:
         self.cur.execute(
             """SELECT id FROM txs WHERE tx_hash=%s""",
-            (tx_hash,),
+            (self._hash_param(tx_hash),),
         )
         data = self.cur.fetchone()
         if data is None:
@@ -128,27 +611,23 @@ class Database:
 
     def get_tx(self, tx_id: int) -> Tx | None:
         self.cur.execute(
-            """SELECT * FROM txs WHERE id=%s""",
+            f"""SELECT {','.join(TX_HOT_COLUMNS)} FROM txs WHERE id=%s""",
             (tx_id,),
         )
         data = self.cur.fetchone()
         if data is None:
             return None
-        return Tx(data[0], data[1], data[2], data[3], data[4], data[5], data[6] or "")
+        return self._tx(data)
 
     def get_tx_specific(self, tx_id: int, fields: list[str]):
         self.cur.execute(
-            f"""SELECT {','.join(fields)} FROM txs WHERE id=%s""",
+            f"""SELECT {self._tx_select(fields)} FROM txs t LEFT JOIN txs_raw r ON r.id = t.id WHERE t.id=%s""",
             (tx_id,),
         )
         data = self.cur.fetchone()
         if data is None:
             return None
-        tx = {fields[i]: data[i] for i in range(len(fields))}
-        for tx_type in Tx.__annotations__.keys():
-            if tx_type not in tx:
-                tx[tx_type] = ""
-        return Tx(**tx)
+        return self._tx(data, fields)
 
     def get_txs_from_address_in_range(self, address: str) -> list[dict]:
         txs = []
@@ -168,16 +647,24 @@ class Database:
         if tx_lower_id == tx_upper_id or tx_lower_id > tx_upper_id:
             return txs
         self.cur.execute(
-            """SELECT * FROM txs WHERE id BETWEEN %s AND %s""",
+            f"""SELECT {','.join(TX_HOT_COLUMNS)} FROM txs WHERE id BETWEEN %s AND %s""",
             (tx_lower_id, tx_upper_id),
         )
         data = self.cur.fetchall()
         if data is None:
             return txs
         for tx in data:
-            txs.append(Tx(tx[0], tx[1], tx[2], tx[3], tx[4], tx[5], tx[6] or ""))
+            txs.append(self._tx(tx))
         return txs
 
+    def get_first_tx_from_id(self, tx_id: int) -> Tx | None:
+        """The first tx with an id >= tx_id, the id sequence has gaps (rolled back reservations)."""
+        self.cur.execute("""SELECT id FROM txs WHERE id >= %s ORDER BY id LIMIT 1""", (tx_id,))
+        data = self.cur.fetchone()
+        if data is None:
+            return None
+        return self.get_tx(data[0])
+
     def get_last_saved_tx(self) -> Tx | None:
         self.cur.execute("""SELECT id FROM txs ORDER BY id DESC LIMIT 1""")
         data = self.cur.fetchone()
@@ -185,30 +672,291 @@ class Database:
             return None
         return self.get_tx(data[0])
 
-    def get_txs_in_range(self, start_height: int, end_height: int) -> list[Tx]:
-        tx_ids = {}
-        for block_index in range(start_height, end_height + 1):
-            b = self.get_block(block_index)
-            if b:
-                for tx_id in b.tx_ids:
-                    tx_ids[tx_id] = True
-        txs = []
-        for tx_id in tx_ids:
-            _tx = self.get_tx(tx_id)
-            if _tx:
-                txs.append(_tx)
-        return txs
+    def get_txs_in_range(self, start_height: int, end_height: int, columns: list[str] | None = None) -> Iterator[Tx]:
+        """
+        Streams the txs of a range in chain order with one query on the txs_height index.
+        columns limits what is loaded (default TX_HOT_COLUMNS), the other Tx fields are "" and
+        tx_amino is fetched per tx on access unless it is in columns. In jsonb mode tx_json &
+        msg_types are jsonb's serialization (keys reordered, whitespace normalized), parse them
+        rather than comparing strings; undecoded txs have "" in both modes.
+        """
+        columns = columns or TX_HOT_COLUMNS
+        unknown = set(columns) - set(TX_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown txs columns: {', '.join(sorted(unknown))}")
+
+        with self.conn.cursor(name="txs_in_range") as cur:
+            cur.itersize = 10_000
+            cur.execute(
+                f"""SELECT {self._tx_select(columns)} FROM txs t LEFT JOIN txs_raw r ON r.id = t.id WHERE t.height BETWEEN %s AND %s ORDER BY t.height, t.id""",
+                (start_height, end_height),
+            )
+            for data in cur:
+                yield self._tx(data, columns)
+
+    def get_tx_amino(self, tx_id: int) -> str:
+        """tx_amino of a tx from the hot txs table, or txs_raw once archived"""
+        self.cur.execute(
+            """SELECT COALESCE(t.tx_amino, r.tx_amino) FROM txs t LEFT JOIN txs_raw r ON r.id = t.id WHERE t.id=%s""",
+            (tx_id,),
+        )
+        data = self.cur.fetchone()
+        if data is None or data[0] is None:
+            return ""
+        return _raw_text("tx_amino", data[0])
 
-    def get_non_decoded_txs_in_range(self, start_height: int, end_height: int) -> list[Tx]:
+    def archive_decoded_txs(self, start_height: int, end_height: int) -> int:
+        """
+        Moves tx_amino of the decoded txs in a range to txs_raw & clears it in txs, returns how
+        many were moved. Undecoded txs keep theirs for do_decode. The space in txs is reused
+        after a VACUUM (VACUUM FULL to give it back to the OS).
+        """
         self.cur.execute(
-            """SELECT * FROM txs WHERE height BETWEEN %s AND %s""",
+            f"""INSERT INTO txs_raw (id, height, tx_amino) SELECT id, height, tx_amino FROM txs
+            WHERE height BETWEEN %s AND %s AND tx_amino IS NOT NULL AND NOT ({self._undecoded()})
+            ON CONFLICT (id) DO UPDATE SET tx_amino = EXCLUDED.tx_amino""",
             (start_height, end_height),
         )
-        data = self.cur.fetchall()
+        moved = self.cur.rowcount
+        self.cur.execute(
+            """UPDATE txs SET tx_amino = NULL WHERE height BETWEEN %s AND %s AND tx_amino IS NOT NULL AND id IN (SELECT id FROM txs_raw WHERE height BETWEEN %s AND %s)""",
+            (start_height, end_height, start_height, end_height),
+        )
+        self.commit()
+        return moved
+
+    def get_message_type_ids(self, msg_types: list[str]) -> dict[str, int]:
+        missing = [t for t in set(msg_types) if t not in self.message_type_ids]
+        if len(missing) > 0:
+            self.cur.execute(
+                """INSERT INTO message_types (type) SELECT unnest(%s::text[]) ON CONFLICT (type) DO NOTHING""",
+                (missing,),
+            )
+            self.cur.execute(
+                """SELECT type, id FROM message_types WHERE type = ANY(%s)""",
+                (missing,),
+            )
+            self.message_type_ids.update(self.cur.fetchall())
+        return {t: self.message_type_ids[t] for t in msg_types}
+
+    def insert_messages(self, rows: list[tuple]):
+        """
+        rows of (tx_id, height, msg_index, parent_index, msg_type, sender, contract, addresses, payload json).
+        Replaces the messages already stored for those txs. Does not commit.
+        """
+        if len(rows) == 0:
+            return
+        type_ids = self.get_message_type_ids([r[4] for r in rows])
+        self.cur.execute(
+            """DELETE FROM messages WHERE tx_id = ANY(%s)""",
+            (list({r[0] for r in rows}),),
+        )
+        self.copy_rows(
+            "messages",
+            MESSAGE_COLUMNS,
+            [(r[0], r[1], r[2], r[3], type_ids[r[4]], r[5], r[6], r[7], _jsonb_text(r[8])) for r in rows],
+        )
+
+    def get_messages(self, start_height: int, end_height: int, msg_types: list[str] | None = None, sender: str | None = None, address: str | None = None) -> Iterator[Message]:
+        """
+        Streams the messages in a range in chain order, optionally only some @types, one sender and /
+        or one involved address. Served by the messages_type_height, messages_sender_height &
+        messages_addresses_gin indexes.
+        """
+        query = """SELECT m.tx_id, m.height, m.msg_index, m.parent_index, t.type, m.sender, m.contract, m.addresses, m.payload FROM messages m JOIN message_types t ON t.id = m.type_id WHERE m.height BETWEEN %s AND %s"""
+        params: list = [start_height, end_height]
+        if msg_types is not None:
+            self.cur.execute("""SELECT id FROM message_types WHERE type = ANY(%s)""", (msg_types,))
+            query += """ AND m.type_id = ANY(%s)"""
+            params.append([x[0] for x in self.cur.fetchall()])
+        if sender is not None:
+            query += """ AND m.sender = %s"""
+            params.append(sender)
+        if address is not None:
+            query += """ AND m.addresses @> ARRAY[%s]"""
+            params.append(address)
+        query += """ ORDER BY m.height, m.tx_id, m.msg_index"""
+
+        with self.conn.cursor(name="messages") as cur:
+            cur.itersize = 10_000
+            cur.execute(query, params)
+            for x in cur:
+                yield Message(x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7] or [], json.loads(x[8]))
+
+    def get_decoded_tx_counts(self, start_height: int, end_height: int, bucket_size: int, msg_type: str | None = None) -> dict[int, int]:
+        """{first height of the bucket: decoded txs}, counted server side. msg_type as in get_fee_totals."""
+        query = f"""SELECT height / %s, COUNT(*) FROM txs WHERE height BETWEEN %s AND %s AND NOT ({self._undecoded()})"""
+        params: list = [bucket_size, start_height, end_height]
+        if msg_type is not None:
+            query += f""" AND {self._json("msg_types")} @> %s::jsonb"""
+            params.append(json.dumps([msg_type]))
+        self.cur.execute(query + """ GROUP BY 1""", params)
+        return {bucket * bucket_size: count for bucket, count in self.cur.fetchall()}
+
+    def get_fee_totals(self, start_height: int, end_height: int, bucket_size: int, msg_type: str | None = None, denom: str | None = None) -> dict[int, dict[str, int]]:
+        """
+        {first height of the bucket: {denom: summed fee amount}} of the decoded txs, aggregated
+        server side. msg_type keeps txs with that (top level) message, denom a single fee denom.
+        Both filters are served by the GIN indexes in jsonb mode.
+        """
+        query = f"""SELECT height / %s, f->>'denom', SUM((f->>'amount')::numeric)
+            FROM txs CROSS JOIN LATERAL jsonb_array_elements({self._json("tx_json")} -> 'auth_info' -> 'fee' -> 'amount') f
+            WHERE height BETWEEN %s AND %s AND NOT ({self._undecoded()})"""
+        params: list = [bucket_size, start_height, end_height]
+        if msg_type is not None:
+            query += f""" AND {self._json("msg_types")} @> %s::jsonb"""
+            params.append(json.dumps([msg_type]))
+        if denom is not None:
+            query += f""" AND {self._json("tx_json")} -> 'auth_info' -> 'fee' -> 'amount' @> %s::jsonb"""
+            params.append(json.dumps([{"denom": denom}]))
+            query += """ AND f->>'denom' = %s"""
+            params.append(denom)
+        query += """ GROUP BY 1, 2"""
+
+        self.cur.execute(query, params)
+        totals: dict[int, dict[str, int]] = {}
+        for bucket, fee_denom, amount in self.cur.fetchall():
+            totals.setdefault(bucket * bucket_size, {})[fee_denom] = int(amount)
+        return totals
+
+    def get_decoded_txs_in_range(self, start_height: int, end_height: int) -> Iterator[Tx]:
+        """Streams id, height & tx_json of the decoded txs in a range. WITH HOLD like get_non_decoded_txs_in_range."""
+        with self.conn.cursor(name="decoded_txs", withhold=True) as cur:
+            cur.itersize = 10_000
+            cur.execute(
+                f"""SELECT id, height, tx_json FROM txs WHERE height BETWEEN %s AND %s AND NOT ({self._undecoded()})""",
+                (start_height, end_height),
+            )
+            self.commit()
+            for x in cur:
+                yield Tx(x[0], x[1], "", [], x[2], "", "")
+
+    def get_non_decoded_tx_ids_in_range(self, start_height: int, end_height: int) -> Iterator[tuple[int, int]]:
+        """
+        (id, height) of the txs without tx_json in a range, from the txs_undecoded index alone.
+        A plain server side cursor, so do not commit on this connection while iterating.
+        """
+        with self.conn.cursor(name="non_decoded_tx_ids") as cur:
+            cur.itersize = 10_000
+            cur.execute(
+                f"""SELECT id, height FROM txs WHERE height BETWEEN %s AND %s AND {self._undecoded()}""",
+                (start_height, end_height),
+            )
+            for x in cur:
+                yield x[0], x[1]
+
+    def get_non_decoded_txs_in_range(self, start_height: int, end_height: int) -> Iterator[Tx]:
+        """
+        Streams the txs without tx_json in a range (only id, height & tx_amino are loaded).
+        Served by the txs_undecoded partial index, so an already decoded range costs next to
+        nothing. The cursor is WITH HOLD & its transaction committed up front, so the caller
+        may commit or rollback on this connection while iterating.
+        """
+        with self.conn.cursor(name="non_decoded_txs", withhold=True) as cur:
+            cur.itersize = 10_000
+            cur.execute(
+                f"""SELECT id, height, tx_amino FROM txs WHERE height BETWEEN %s AND %s AND {self._undecoded()}""",
+                (start_height, end_height),
+            )
+            self.commit()
+            for x in cur:
+                yield Tx(x[0], x[1], _raw_text("tx_amino", x[2]), [], "", "", "")
+
+class AsyncDatabase:
+    """
+    asyncpg connection pool for the download path, so COPYs & lookups are awaited
+    while blocks keep downloading. Same table layout & semantics as Database.
+    """
+
+    def __init__(self, pool, jsonb: bool = False, partition_size: int = 0, binary: bool = False):
+        self.pool = pool
+        self.jsonb = jsonb
+        self.binary = binary
+        self.partition_size = partition_size
+        self.partitions: set[int] = set()
+
+    @classmethod
+    async def connect(cls, dbname, user, password, host, port, pool_size: int = 4, partition_size: int = 0) -> "AsyncDatabase":
+        if asyncpg is None:
+            raise ImportError("AsyncDatabase needs asyncpg: pip install asyncpg")
+        pool = await asyncpg.create_pool(database=dbname, user=user, password=password, host=host, port=port, min_size=1, max_size=pool_size)
+        if await pool.fetchval(PARTITIONED_QUERY):
+            partition_size = resolve_partition_size([r[0] for r in await pool.fetch(PARTITION_BOUNDS_QUERY)], partition_size)
+        else:
+            partition_size = 0
+        return cls(
+            pool,
+            jsonb=await pool.fetchval(JSON_MODE_QUERY) == "jsonb",
+            partition_size=partition_size,
+            binary=await pool.fetchval(RAW_MODE_QUERY) == "bytea",
+        )
+
+    async def close(self):
+        await self.pool.close()
+
+    async def get_block(self, block_height: int) -> Block | None:
+        data = await self.pool.fetchrow("""SELECT * FROM blocks WHERE height=$1""", block_height)
         if data is None:
-            return []
-        txs = []
-        for x in data:
-            if len(x[4]) == 0:
-                txs.append(Tx(x[0], x[1], x[2], x[3], x[4], x[5], x[6]))
-        return txs
+            return None
+        return Block(data[0], data[1], list(data[2] or []))
+
+    async def get_latest_saved_block(self) -> Block | None:
+        data = await self.pool.fetchrow("""SELECT * FROM blocks ORDER BY height DESC LIMIT 1""")
+        if data is None:
+            return None
+        return Block(data[0], data[1], list(data[2] or []))
+
+    async def get_saved_heights(self, start_height: int, end_height: int) -> bytearray:
+        saved = bytearray(max(end_height - start_height + 1, 0))
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor("""SELECT height FROM blocks WHERE height BETWEEN $1 AND $2""", start_height, end_height, prefetch=100_000):
+                    saved[record[0] - start_height] = 1
+        return saved
+
+    async def ensure_partitions(self, heights: list[int]):
+        """
+        Same as Database.ensure_partitions, but each partition is created & committed on its own:
+        adding a partition locks the parent table, which must not be held for a whole ingest batch.
+        """
+        if self.partition_size <= 0:
+            return
+        for start, end in sorted({partition_bounds(h, self.partition_size) for h in heights}):
+            if start in self.partitions:
+                continue
+            for table in PARTITIONED_TABLES:
+                try:
+                    await self.pool.execute(partition_ddl(table, start, end))
+                except (asyncpg.DuplicateTableError, asyncpg.UniqueViolationError):
+                    # another worker created it between our IF NOT EXISTS check & the create
+                    pass
+            self.partitions.add(start)
+
+    async def insert_blocks(self, values: list[BlockData]) -> dict[int, list[int]]:
+        """
+        Same as Database.insert_blocks, but commits: the whole batch is one transaction.
+        """
+        values = unique_blocks(values)
+        if len(values) == 0:
+            return {}
+        total_txs = sum(len(bd.encoded_txs) for bd in values)
+        await self.ensure_partitions([bd.height for bd in values])
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                tx_ids = []
+                if total_txs > 0:
+                    rows = await conn.fetch(
+                        """SELECT nextval(pg_get_serial_sequence('txs', 'id')) FROM generate_series(1, $1)""",
+                        total_txs,
+                    )
+                    tx_ids = [r[0] for r in rows]
+
+                tx_rows, block_rows, saved = build_ingest_rows(values, iter(tx_ids), None if self.jsonb else "", self.binary)
+                await conn.execute(BLOCKS_STAGING_DDL)
+                await conn.execute("""TRUNCATE blocks_staging""")
+                await conn.copy_records_to_table("blocks_staging", records=block_rows, columns=BLOCK_COLUMNS)
+                inserted = {r[0] for r in await conn.fetch(BLOCKS_FROM_STAGING)}
+                tx_rows, saved = only_inserted(tx_rows, saved, inserted)
+                if tx_rows:
+                    await conn.copy_records_to_table("txs", records=tx_rows, columns=TX_COLUMNS)
+        return saved
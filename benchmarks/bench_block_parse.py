@@ -0,0 +1,106 @@
+"""
+Microbenchmark: full r.json() style parsing of a /block response vs block_parser.parse_block_response.
+
+    python benchmarks/bench_block_parse.py                      # synthetic busy block
+    python benchmarks/bench_block_parse.py fixtures/*.json      # captured /block responses
+    python benchmarks/bench_block_parse.py --capture <rpc> <height> [<height> ...]
+"""
+
+import base64
+import json
+import os
+import sys
+import timeit
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current_dir)
+sys.path.append(parent)
+
+from block_parser import loads, parse_block_response
+
+fixtures_dir = os.path.join(current_dir, "fixtures")
+
+
+def capture(rpc: str, heights: list[str]):
+    import httpx
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for height in heights:
+        r = httpx.get(f"{rpc.rstrip('/')}/block?height={height}", timeout=30)
+        r.raise_for_status()
+        with open(os.path.join(fixtures_dir, f"block_{height}.json"), "wb") as f:
+            f.write(r.content)
+        print(f"Saved block {height} ({len(r.content):,} bytes)")
+
+
+def synthetic_block(num_txs: int = 500, num_signatures: int = 150) -> bytes:
+    # same shape & pretty printing as a CometBFT v0.38 /block response
+    def b64(n: int) -> str:
+        return base64.b64encode(os.urandom(n)).decode()
+
+    signatures = [
+        {"block_id_flag": 2, "validator_address": os.urandom(20).hex().upper(), "timestamp": "2024-05-01T10:00:00.123456789Z", "signature": b64(64)}
+        for _ in range(num_signatures)
+    ]
+    body = {
+        "jsonrpc": "2.0",
+        "id": -1,
+        "result": {
+            "block_id": {"hash": os.urandom(32).hex().upper(), "parts": {"total": 1, "hash": os.urandom(32).hex().upper()}},
+            "block": {
+                "header": {
+                    "version": {"block": "11", "app": "0"},
+                    "chain_id": "initiation-1",
+                    "height": "1000000",
+                    "time": "2024-05-01T10:00:00.123456789Z",
+                    "last_block_id": {"hash": os.urandom(32).hex().upper(), "parts": {"total": 1, "hash": os.urandom(32).hex().upper()}},
+                    "last_commit_hash": os.urandom(32).hex().upper(),
+                    "data_hash": os.urandom(32).hex().upper(),
+                    "validators_hash": os.urandom(32).hex().upper(),
+                    "proposer_address": os.urandom(20).hex().upper(),
+                },
+                "data": {"txs": [b64(400) for _ in range(num_txs)]},
+                "evidence": {"evidence": []},
+                "last_commit": {"height": "999999", "round": 0, "block_id": {"hash": os.urandom(32).hex().upper()}, "signatures": signatures},
+            },
+        },
+    }
+    return json.dumps(body, indent=2).encode()
+
+
+def full_parse(content: bytes) -> tuple[str, list[str]]:
+    # what download_block did before: r.json() then pick the two fields
+    v = json.loads(content)["result"]["block"]
+    return v["header"]["time"], v["data"]["txs"]
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "--capture":
+        capture(args[1], args[2:])
+        return
+
+    fixtures = {}
+    for path in args:
+        with open(path, "rb") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    if len(fixtures) == 0:
+        fixtures["synthetic-500txs"] = synthetic_block()
+        fixtures["synthetic-empty"] = synthetic_block(num_txs=0)
+
+    for name, content in fixtures.items():
+        assert parse_block_response(content) == full_parse(content), f"{name}: parse mismatch"
+
+        number = 200
+        full = timeit.timeit(lambda: full_parse(content), number=number) / number
+        full_fast_lib = timeit.timeit(lambda: loads(content)["result"]["block"], number=number) / number
+        selective = timeit.timeit(lambda: parse_block_response(content), number=number) / number
+        print(
+            f"{name} ({len(content):,} bytes): json.loads {full * 1e6:,.1f}us | "
+            f"{loads.__module__}.loads {full_fast_lib * 1e6:,.1f}us | selective {selective * 1e6:,.1f}us "
+            f"({full / selective:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark of the decoder drivers: temp files vs stdin/stdout pipe
+vs the in process decoder (without fallback, so unknown types are skipped & not timed).
+
+    python benchmarks/bench_decode.py <decoder binary> <fixture> [<fixture> ...]
+
+Fixtures are either captured /block responses (see bench_block_parse.py --capture) or a
+json list of base64 txs. Before timing, every tx the in process decoder handles is checked
+against the binary's output (same json, same key order); any difference fails the run.
+"""
+
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current_dir)
+sys.path.append(parent)
+
+from block_parser import parse_block_response
+from decoder import DecoderError, FileDecoder, PipeDecoder, PythonDecoder
+
+BATCH_SIZES = [1, 10, 100, 1_000]
+
+
+def load_txs(paths: list[str]) -> list[str]:
+    txs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        data = json.loads(content)
+        if isinstance(data, list):
+            txs.extend(data)
+        else:
+            txs.extend(parse_block_response(content)[1])
+    return txs
+
+
+def as_json(tx) -> str:
+    # the binary's "tx" may be a json string or already an object
+    return json.dumps(json.loads(tx) if isinstance(tx, str) else tx)
+
+
+def check_compatible(python_decoder: PythonDecoder, binary_decoder, txs: list[str]) -> int:
+    """Compares the in process output with the binary's, returns how many txs differ."""
+    batch = [{"id": i, "tx": tx} for i, tx in enumerate(txs)]
+    expected = {v["id"]: as_json(v["tx"]) for v in binary_decoder.decode(batch)}
+    decoded = python_decoder.decode(batch)
+
+    mismatches = 0
+    for v in decoded:
+        got = as_json(v["tx"])
+        if got != expected.get(v["id"]):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"tx {v['id']} differs:\n  python {got[:500]}\n  binary {str(expected.get(v['id']))[:500]}")
+    print(f"{len(decoded):,}/{len(txs):,} txs decoded in process, {mismatches:,} differ from the binary")
+    return mismatches
+
+
+def bench(decoder, txs: list[str], batch_size: int, rounds: int) -> float:
+    batch = [{"id": i, "tx": txs[i % len(txs)]} for i in range(batch_size)]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decoder.decode(batch)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        exit(1)
+
+    binary = sys.argv[1]
+    txs = load_txs(sys.argv[2:])
+    if len(txs) == 0:
+        print("No txs found in the fixtures")
+        exit(1)
+    print(f"{len(txs):,} distinct txs")
+
+    if check_compatible(PythonDecoder(), PipeDecoder(binary), txs) > 0:
+        exit(1)
+
+    decoders = {
+        "file": FileDecoder(binary, os.path.join(current_dir, "tmp_decode")),
+        "pipe": PipeDecoder(binary),
+        "python": PythonDecoder(),
+    }
+
+    for batch_size in BATCH_SIZES:
+        rounds = max(3, 300 // batch_size)
+        results = []
+        for name, decoder in decoders.items():
+            try:
+                per_batch = bench(decoder, txs, batch_size, rounds)
+                results.append(f"{name} {per_batch * 1e3:,.2f}ms ({batch_size / per_batch:,.0f} txs/s)")
+            except DecoderError as e:
+                results.append(f"{name} unsupported ({e})")
+        print(f"batch {batch_size:>5}: " + " | ".join(results))
+
+    for decoder in decoders.values():
+        decoder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import json
+
+try:
+    # optional, 3-5x faster than the stdlib for the fallback & batch paths
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+def _find(content: bytes, token: bytes, start: int) -> int:
+    idx = content.find(token, start)
+    if idx < 0:
+        raise ValueError(f"{token!r} not found")
+    return idx
+
+
+def _value_start(content: bytes, key_end: int) -> int:
+    # skips the whitespace and colon between a key and its value
+    idx = _find(content, b":", key_end) + 1
+    while content[idx : idx + 1] in (b" ", b"\n", b"\r", b"\t"):
+        idx += 1
+    return idx
+
+
+def _fast_parse(content: bytes) -> tuple[str, list[str]]:
+    block = _find(content, b'"block"', _find(content, b'"result"', 0))
+    header = _find(content, b'"header"', block)
+
+    time_key = _find(content, b'"time"', header)
+    time_start = _value_start(content, time_key + 6)
+    if content[time_start : time_start + 1] != b'"':
+        raise ValueError("header time is not a string")
+    block_time = content[time_start + 1 : _find(content, b'"', time_start + 1)].decode()
+
+    data = _find(content, b'"data"', time_key)
+    txs_key = _find(content, b'"txs"', data)
+    txs_start = _value_start(content, txs_key + 5)
+    if content.startswith(b"null", txs_start):
+        return block_time, []
+    if content[txs_start : txs_start + 1] != b"[":
+        raise ValueError("data txs is not a list")
+
+    # base64 txs never contain ']' so the first one closes the list
+    txs_end = _find(content, b"]", txs_start)
+    return block_time, loads(content[txs_start : txs_end + 1])
+
+
+def _block_fields(result) -> tuple[str, list[str]] | None:
+    # result of an already parsed /block answer, None if it holds no block
+    try:
+        v = result["block"]
+        return v["header"]["time"], v["data"]["txs"] or []
+    except (KeyError, TypeError):
+        return None
+
+
+def parse_block_response(content: bytes) -> tuple[str, list[str]] | None:
+    """
+    Pulls only header.time & data.txs out of a raw CometBFT /block response body,
+    skipping the signatures, last_commit & evidence a full json parse would build.
+    Falls back to a full parse if the body does not look as expected.
+    Returns None if the response holds no block or is not valid JSON.
+    """
+    try:
+        return _fast_parse(content)
+    except (ValueError, UnicodeDecodeError):
+        pass
+    try:
+        body = loads(content)
+    except ValueError:
+        return None
+    return _block_fields(body.get("result") if isinstance(body, dict) else None)
+
+
+def _int_value(content: bytes, key_end: int) -> int:
+    # JSON-RPC ids & header heights, written as 123 or "123"
+    start = _value_start(content, key_end)
+    if content[start : start + 1] == b'"':
+        start += 1
+    end = start
+    while content[end : end + 1].isdigit():
+        end += 1
+    return int(content[start:end])
+
+
+def _fast_parse_batch(content: bytes) -> dict[int, tuple[str, list[str]]]:
+    starts = []
+    idx = content.find(b'"id"')
+    while idx >= 0:
+        starts.append(idx)
+        idx = content.find(b'"id"', idx + 4)
+    if len(starts) == 0 or not content.lstrip().startswith(b"["):
+        raise ValueError("not a batch answer")
+
+    blocks = {}
+    for i, start in enumerate(starts):
+        item = content[start : starts[i + 1] if i + 1 < len(starts) else len(content)]
+        if b'"result"' not in item:
+            # an "error" answer, the height is retried
+            continue
+        height = _int_value(item, 4)
+        # the id is the height, a mismatch means the items were not split where expected
+        header_height = _find(item, b'"height"', _find(item, b'"header"', 0))
+        if _int_value(item, header_height + 8) != height:
+            raise ValueError(f"batch item {height} holds another height")
+        blocks[height] = _fast_parse(item)
+    return blocks
+
+
+def parse_block_batch(content: bytes) -> dict[int, tuple[str, list[str]] | None]:
+    """
+    parse_block_response for the answer of a JSON-RPC batch of /block requests, keyed by
+    the request id (the height). Items without a result are left out, items whose result
+    holds no block map to None. Raises ValueError if the body is not a JSON list.
+    """
+    try:
+        return _fast_parse_batch(content)
+    except (ValueError, UnicodeDecodeError):
+        pass
+    body = loads(content)
+    if not isinstance(body, list):
+        raise ValueError("batch answer is not a list")
+    return {
+        item["id"]: _block_fields(item["result"])
+        for item in body
+        if isinstance(item, dict) and isinstance(item.get("id"), int) and "result" in item
+    }
@@ -0,0 +1,152 @@
+import json
+import os
+import struct
+import uuid
+from array import array
+from bisect import bisect_right
+
+try:
+    # optional, only needed when the raw block cache is enabled (pip install zstandard)
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# index record: height, offset in the segment, compressed length
+INDEX_RECORD = struct.Struct("<QQI")
+
+
+class BlockStore:
+    """
+    Append-only, zstd compressed store of downloaded blocks on local disk, so a re-ingest
+    or re-decode never has to hit the archive RPCs again.
+
+    Every process appends to its own `<writer>.seg` segment with a `<writer>.idx` offset
+    index by height next to it, so several workers can share one directory. Each block is
+    compressed on its own to allow random reads. Segments roll over at `segment_size` bytes.
+
+    The loaded index is kept as height sorted arrays (22 bytes per block), not a dict, so a
+    multi-million block cache stays small in every process which opens it.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 256 * 1024 * 1024, level: int = 3):
+        if zstandard is None:
+            raise ImportError("The raw block cache needs zstandard: pip install zstandard")
+
+        self.directory = directory
+        self.segment_size = segment_size
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+        # segment names, the index refers to them by position
+        self.segments: list[str] = []
+        # index sorted by height: (segment id, offset, length) of every stored block
+        self.heights = array("Q")
+        self.segment_ids = array("H")
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.count = 0
+        self.readers: dict[str, object] = {}
+        self.segment_name = ""
+        self.segment_id = -1
+        self.segment = None
+        self.segment_index = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_indexes()
+
+    def _load_indexes(self):
+        heights, segment_ids, offsets, lengths = array("Q"), array("H"), array("Q"), array("I")
+        for file in sorted(os.listdir(self.directory)):
+            if not file.endswith(".idx"):
+                continue
+            segment_id = len(self.segments)
+            self.segments.append(file[: -len(".idx")])
+            with open(os.path.join(self.directory, file), "rb") as f:
+                data = f.read()
+            # a torn last record from a crash is ignored
+            usable = len(data) - len(data) % INDEX_RECORD.size
+            for height, offset, length in INDEX_RECORD.iter_unpack(data[:usable]):
+                heights.append(height)
+                segment_ids.append(segment_id)
+                offsets.append(offset)
+                lengths.append(length)
+
+        # stable: a height stored twice keeps file order, the last one wins like it used to
+        order = sorted(range(len(heights)), key=heights.__getitem__)
+        self.heights = array("Q", (heights[i] for i in order))
+        self.segment_ids = array("H", (segment_ids[i] for i in order))
+        self.offsets = array("Q", (offsets[i] for i in order))
+        self.lengths = array("I", (lengths[i] for i in order))
+        self.count = sum(1 for i in range(len(self.heights)) if i == 0 or self.heights[i] != self.heights[i - 1])
+
+    def _locate(self, height: int) -> tuple[int, int, int] | None:
+        i = bisect_right(self.heights, height) - 1
+        if i >= 0 and self.heights[i] == height:
+            return self.segment_ids[i], self.offsets[i], self.lengths[i]
+        return None
+
+    def _open_segment(self):
+        self.close()
+        self.segment_name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.segment_id = len(self.segments)
+        self.segments.append(self.segment_name)
+        self.segment = open(os.path.join(self.directory, f"{self.segment_name}.seg"), "ab")
+        self.segment_index = open(os.path.join(self.directory, f"{self.segment_name}.idx"), "ab")
+
+    def __contains__(self, height: int) -> bool:
+        return self._locate(height) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, height: int) -> tuple[str, list[str]] | None:
+        """Returns (block time, encoded txs) of a stored height."""
+        location = self._locate(height)
+        if location is None:
+            return None
+
+        segment_id, offset, length = location
+        name = self.segments[segment_id]
+        reader = self.readers.get(name)
+        if reader is None:
+            reader = open(os.path.join(self.directory, f"{name}.seg"), "rb")
+            self.readers[name] = reader
+
+        reader.seek(offset)
+        v = json.loads(self.decompressor.decompress(reader.read(length)))
+        return v["time"], v["txs"]
+
+    def put(self, height: int, block_time: str, encoded_txs: list[str]):
+        """Stores a block before TX_AMINO_LENGTH_CUTTOFF_LIMIT filtering, so changing it later does not need a re-download."""
+        if height in self:
+            return
+
+        if self.segment is None or self.segment.tell() >= self.segment_size:
+            self._open_segment()
+
+        data = self.compressor.compress(json.dumps({"time": block_time, "txs": encoded_txs}).encode())
+        offset = self.segment.tell()
+        self.segment.write(data)
+        # data first, so an index entry never points past the end of its segment
+        self.segment.flush()
+        self.segment_index.write(INDEX_RECORD.pack(height, offset, len(data)))
+        self.segment_index.flush()
+        # downloads put mostly ascending heights, so this inserts at or near the end
+        i = bisect_right(self.heights, height)
+        self.heights.insert(i, height)
+        self.segment_ids.insert(i, self.segment_id)
+        self.offsets.insert(i, offset)
+        self.lengths.insert(i, len(data))
+        self.count += 1
+
+    def close(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment_index.close()
+            self.segment = None
+            self.segment_index = None
+            self.segment_name = ""
+            self.segment_id = -1
+        for reader in self.readers.values():
+            reader.close()
+        self.readers.clear()
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Callable
 
 
 @dataclass
@@ -25,8 +26,29 @@ class Block:
 class Tx:
     id: int
     height: int
-    tx_amino: str
+    raw_amino: str | None  # None when not loaded, see tx_amino
     msg_types: list[str]  # JSON.load
     tx_json: str
     address: str
     tx_hash: str
+    loader: Callable[[int], str] | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def tx_amino(self) -> str:
+        """Loaded on first access when the query skipped it (or it was archived to txs_raw)."""
+        if self.raw_amino is None:
+            self.raw_amino = self.loader(self.id) if self.loader is not None else ""
+        return self.raw_amino
+
+
+@dataclass
+class Message:
+    tx_id: int
+    height: int
+    msg_index: int
+    parent_index: int | None  # index of the wrapping authz MsgExec / MsgSubmitProposal
+    msg_type: str
+    sender: str | None
+    contract: str | None
+    addresses: list[str]  # every wallet / valoper address in the message, wrapped ones excluded
+    payload: dict
@@ -0,0 +1,137 @@
+import json
+import os
+import subprocess
+import uuid
+
+from proto_decoder import decode_tx
+from util import run_decode_file
+
+DECODE_MODES = ["auto", "python", "pipe", "file"]
+
+
+class DecoderError(Exception):
+    pass
+
+
+class FileDecoder:
+    """
+    `<binary> tx decode-file <in> <out>` with a temp file pair per batch.
+    """
+
+    def __init__(self, binary: str, tmp_dir: str):
+        self.binary = binary
+        self.tmp_dir = tmp_dir
+        os.makedirs(tmp_dir, exist_ok=True)
+
+    def decode(self, to_decode: list[dict]) -> list[dict]:
+        _rand = str(uuid.uuid4())
+        DUMPFILE = os.path.join(self.tmp_dir, f"in-{_rand}.json")
+        OUTFILE = os.path.join(self.tmp_dir, f"out-{_rand}.json")
+
+        with open(DUMPFILE, "w") as f:
+            json.dump(to_decode, f)
+
+        try:
+            return run_decode_file(self.binary, DUMPFILE, OUTFILE)
+        finally:
+            for file in (DUMPFILE, OUTFILE):
+                if os.path.exists(file):
+                    os.remove(file)
+
+    def close(self):
+        pass
+
+
+class PipeDecoder:
+    """
+    Same decode-file command, but reading /dev/stdin & writing /dev/stdout: no temp files.
+    """
+
+    def __init__(self, binary: str):
+        self.binary = binary
+
+    def decode(self, to_decode: list[dict]) -> list[dict]:
+        res = subprocess.run(
+            [self.binary, "tx", "decode-file", "/dev/stdin", "/dev/stdout"],
+            input=json.dumps(to_decode).encode(),
+            capture_output=True,
+        )
+        if res.returncode != 0:
+            raise DecoderError(f"decode-file exited with {res.returncode}: {res.stderr.decode(errors='replace')[:500]}")
+        try:
+            return json.loads(res.stdout)
+        except ValueError as e:
+            raise DecoderError(f"decode-file did not write json to stdout: {e}")
+
+    def close(self):
+        pass
+
+
+class AutoDecoder:
+    """
+    Tries the pipe, then temp files. The first mode which works is kept, so a failing mode
+    costs one batch at most.
+    """
+
+    def __init__(self, decoders: list):
+        self.decoders = decoders
+
+    def decode(self, to_decode: list[dict]) -> list[dict]:
+        while True:
+            decoder = self.decoders[0]
+            if len(self.decoders) == 1:
+                return decoder.decode(to_decode)
+            try:
+                return decoder.decode(to_decode)
+            except DecoderError as e:
+                print(f"Decoder {type(decoder).__name__} failed ({e}), falling back to {type(self.decoders[1]).__name__}")
+                decoder.close()
+                self.decoders.pop(0)
+
+    def close(self):
+        for decoder in self.decoders:
+            decoder.close()
+
+
+class PythonDecoder:
+    """
+    Decodes registered message types in process (see proto_decoder.py), no subprocess or json
+    round trip. The "tx" of its results is already a dict. Txs with a type it does not know go
+    to the fallback decoder, or are left undecoded when there is none.
+    """
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback
+
+    def decode(self, to_decode: list[dict]) -> list[dict]:
+        values = []
+        unknown = []
+        for item in to_decode:
+            try:
+                values.append({"id": item["id"], "tx": decode_tx(item["tx"])})
+            except Exception:
+                # UnknownTypeError, or proposer supplied bytes which are anything but a valid tx
+                # (out of range timestamps, nesting past the recursion limit, ...): never fail
+                # the batch, let the binary judge the tx
+                unknown.append(item)
+
+        if len(unknown) > 0 and self.fallback is not None:
+            values.extend(self.fallback.decode(unknown))
+        return values
+
+    def close(self):
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+def create_decoder(binary: str | None, mode: str, tmp_dir: str):
+    """binary may only be None in python mode, unknown types are then left undecoded."""
+    if mode == "python":
+        return PythonDecoder(None if binary is None else create_decoder(binary, "auto", tmp_dir))
+    if mode == "file":
+        return FileDecoder(binary, tmp_dir)
+    if mode == "pipe":
+        return PipeDecoder(binary)
+    if mode == "auto":
+        return AutoDecoder([PipeDecoder(binary), FileDecoder(binary, tmp_dir)])
+    raise ValueError(f"Unknown decode mode {mode}, use one of {', '.join(DECODE_MODES)}")
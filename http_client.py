@@ -0,0 +1,35 @@
+import importlib.util
+import random
+
+import httpx
+
+
+def create_async_client(
+    max_connections: int = 100,
+    max_keepalive_connections: int = 50,
+    keepalive_expiry: float = 30,
+    http2: bool = False,
+    timeout: float = 30,
+) -> httpx.AsyncClient:
+    """
+    Shared httpx client with an explicit, keep-alive friendly connection pool.
+    HTTP/2 needs the optional `h2` package (pip install httpx[http2]).
+    """
+    if http2 and importlib.util.find_spec("h2") is None:
+        print("HTTP2 is enabled but the h2 package is not installed (pip install httpx[http2]). Using HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    return httpx.AsyncClient(limits=limits, http2=http2, timeout=httpx.Timeout(timeout, connect=10))
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 10) -> float:
+    """
+    Exponential backoff with full jitter, so retries from many tasks spread out
+    instead of hitting a throttled node at the same moment.
+    """
+    return random.uniform(0, min(cap, base * (2**attempt)))
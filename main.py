@@ -1,17 +1,27 @@
 import asyncio
+import itertools
 import json
+import multiprocessing
 import os
 import random
 import sys
 import time
 import traceback
-import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Iterable
 
 import httpx
 
+from block_parser import parse_block_batch, parse_block_response
+from block_store import BlockStore
 from chain_types import BlockData, DecodeGroup
-from SQL import Database
-from util import command_exists, get_latest_chain_height, get_sender, run_decode_file
+from http_client import backoff_delay, create_async_client
+from SQL import AsyncDatabase, Database
+from rpc_scheduler import EndpointScheduler
+from decoder import create_decoder
+from msg_extractor import WRAPPERS, MsgExtractor
+from util import command_exists
+from ws_subscriber import subscribe_new_blocks, websocket_url, websockets
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
 
@@ -19,7 +29,7 @@ with open(os.path.join(current_dir, "chain_config.json"), "r") as f:
     chain_config = dict(json.load(f))
 
 TASK = chain_config.get("TASK", "no_impl").lower()
-all_tasks = ["missing", "download", "sync", "decode"]
+all_tasks = ["missing", "download", "sync", "decode", "messages", "archive"]
 if TASK not in all_tasks:
     print(f"TASK is not in the allowed group {', '.join(all_tasks)}")
     exit(1)
@@ -30,17 +40,24 @@ if len(sys.argv) < 2:
 
 chain_section_key = sys.argv[1]
 
+# supervisor.py runs this file with --worker and hands out block ranges over stdin
+WORKER_MODE = "--worker" in sys.argv[2:]
+WORKER_CHUNK_DONE = "@@chunk_done"
+
 COSMOS_PROTO_DECODER_BINARY_FILE = chain_config.get("COSMOS_PROTO_DECODE_BINARY", "juno-decode")
 DECODE_LIMIT = chain_config.get("COSMOS_PROTO_DECODE_LIMIT", 10_000)
 COSMOS_PROTO_DECODE_BLOCK_LIMIT = chain_config.get("COSMOS_PROTO_DECODE_BLOCK_LIMIT", 10_000)
-if not command_exists(COSMOS_PROTO_DECODER_BINARY_FILE):
-    print(f"Command {COSMOS_PROTO_DECODER_BINARY_FILE} not found")
-    exit(1)
+DECODE_WORKERS = chain_config.get("COSMOS_PROTO_DECODE_WORKERS", 1)
 
 TX_AMINO_LENGTH_CUTTOFF_LIMIT = chain_config.get("TX_AMINO_LENGTH_CUTTOFF_LIMIT", 0)
+# text or jsonb: how txs.tx_json & msg_types are stored. Switching an existing db to jsonb migrates it on start
+TX_JSON_STORAGE = chain_config.get("TX_JSON_STORAGE", "text").lower()
+# text or bytea: txs.tx_amino as base64 & tx_hash as hex, or the raw bytes & 32 byte digest. bytea migrates on start
+TX_RAW_STORAGE = chain_config.get("TX_RAW_STORAGE", "text").lower()
 
 WALLET_PREFIX = chain_config.get("WALLET_PREFIX", "juno1")
 VALOPER_PREFIX = chain_config.get("VALOPER_PREFIX", "junovaloper1")
+extractor = MsgExtractor(WALLET_PREFIX, VALOPER_PREFIX)
 
 specific_section = chain_config.get("sections", {}).get(chain_section_key, {})
 if specific_section == {}:
@@ -50,6 +67,9 @@ if specific_section == {}:
 START_BLOCK = specific_section.get("start", -1)
 END_BLOCK = specific_section.get("end", -1)
 GROUPING = specific_section.get("grouping", 10_000)
+MAX_IN_FLIGHT = specific_section.get("max_in_flight", 100)
+FLUSH_SIZE = specific_section.get("flush_size", GROUPING)
+FLUSH_INTERVAL = specific_section.get("flush_interval", 5)
 if START_BLOCK < 0 or END_BLOCK < 0:
     print("START_BLOCK or END_BLOCK is not set correctly")
     exit(1)
@@ -58,8 +78,35 @@ if len(RPC_ARCHIVE_LINKS) == 0:
     print(f"RPC_ARCHIVE_LINKS is empty")
     exit(1)
 
+# "" disables the websocket & sync mode polls the chain tip every SYNC_POLL_INTERVAL seconds
+WEBSOCKET_URL = specific_section.get("websocket_endpoint", websocket_url(RPC_ARCHIVE_LINKS[0]))
+WEBSOCKET_IDLE_TIMEOUT = chain_config.get("WEBSOCKET_IDLE_TIMEOUT", 60)
+SYNC_POLL_INTERVAL = chain_config.get("SYNC_POLL_INTERVAL", 10)
+
+RPC_MAX_ATTEMPTS = chain_config.get("RPC_MAX_ATTEMPTS", 5)
+RPC_BATCH_SIZE = chain_config.get("RPC_BATCH_SIZE", 20)
+RPC_BACKOFF_BASE = chain_config.get("RPC_BACKOFF_BASE", 0.5)
+RPC_BACKOFF_MAX = chain_config.get("RPC_BACKOFF_MAX", 10)
+scheduler = EndpointScheduler(
+    RPC_ARCHIVE_LINKS,
+    failure_threshold=chain_config.get("RPC_FAILURE_THRESHOLD", 5),
+    eject_seconds=chain_config.get("RPC_EJECT_SECONDS", 30),
+    max_concurrency=chain_config.get("RPC_ENDPOINT_CONCURRENCY", 16),
+)
+
 tmp_decode_dir = os.path.join(current_dir, "tmp_decode")
-os.makedirs(tmp_decode_dir, exist_ok=True)
+
+# auto: stdin/stdout pipe, else temp files
+# python: in process for the registered message types, the binary (auto) for the rest
+COSMOS_PROTO_DECODE_MODE = chain_config.get("COSMOS_PROTO_DECODE_MODE", "auto")
+if not command_exists(COSMOS_PROTO_DECODER_BINARY_FILE):
+    if COSMOS_PROTO_DECODE_MODE != "python":
+        print(f"Command {COSMOS_PROTO_DECODER_BINARY_FILE} not found")
+        exit(1)
+    print(f"Command {COSMOS_PROTO_DECODER_BINARY_FILE} not found, txs with unregistered message types stay undecoded")
+    COSMOS_PROTO_DECODER_BINARY_FILE = None
+
+decoder = create_decoder(COSMOS_PROTO_DECODER_BINARY_FILE, COSMOS_PROTO_DECODE_MODE, tmp_decode_dir)
 
 built_in_print = print
 
@@ -68,32 +115,102 @@ def print(*args, **kwargs):
 
 print(f"Starting {TASK} task")
 
+# PostgreSQL connection parameters
+DB_PARAMS = {
+    'dbname': 'your_db_name',
+    'user': 'your_username',
+    'password': 'your_password',
+    'host': 'your_host',
+    'port': 'your_port'
+}
+DB_POOL_SIZE = chain_config.get("DB_POOL_SIZE", 4)
+# > 0: new blocks & txs tables are range partitioned by height, this many heights per partition
+PARTITION_SIZE = chain_config.get("PARTITION_SIZE", 0)
+# download task: the txs secondary indexes are dropped while downloading & built concurrently at the tip.
+# Only for one process (or supervisor.py), a second section's process would rebuild them under the first
+BULK_LOAD = chain_config.get("BULK_LOAD", False)
+# supervisor.py runs this once all its workers are done
+BUILD_INDEXES = "--build-indexes" in sys.argv[2:]
+
 db: Database
+adb: AsyncDatabase
+decode_pool: ProcessPoolExecutor | None = None
+# sync mode: height ranges saved by the writer, waiting for the decode stage
+decode_queue: asyncio.Queue | None = None
+
+# "" disables the local raw block cache
+BLOCK_CACHE_DIR = chain_config.get("BLOCK_CACHE_DIR", "")
+# opened under __main__ for the download paths only, decode workers re-import this module
+block_store: BlockStore | None = None
+
+def open_block_store() -> BlockStore | None:
+    if not BLOCK_CACHE_DIR:
+        return None
+    store = BlockStore(os.path.join(current_dir, BLOCK_CACHE_DIR), segment_size=chain_config.get("BLOCK_CACHE_SEGMENT_MB", 256) * 1024 * 1024)
+    print(f"Raw block cache: {len(store):,} blocks in {BLOCK_CACHE_DIR}")
+    return store
 
-async def download_block(client: httpx.AsyncClient, height: int) -> BlockData | None:
-    if db.get_block(height) is not None:
-        if height % (GROUPING * 5) == 0:
-            print(f"Block {height} is already saved.")
+def cache_block(height: int, block_time: str, encoded_block_txs: list[str]):
+    if block_store is not None:
+        block_store.put(height, block_time, encoded_block_txs)
+
+def cached_block(height: int) -> BlockData | None:
+    if block_store is None:
+        return None
+    cached = block_store.get(height)
+    if cached is None:
         return None
+    return to_block_data(height, *cached)
+
+async def download_block(client: httpx.AsyncClient, height: int) -> BlockData | None:
+    bd = cached_block(height)
+    if bd is not None:
+        return bd
+
+    tried: set[str] = set()
+    for attempt in range(RPC_MAX_ATTEMPTS):
+        if attempt > 0:
+            await asyncio.sleep(backoff_delay(attempt - 1, RPC_BACKOFF_BASE, RPC_BACKOFF_MAX))
+
+        endpoint = scheduler.pick(height, exclude=tried)
+        if endpoint is None:
+            print(f"Error: no RPC endpoint can serve height {height}")
+            return None
+        tried.add(endpoint.url)
+
+        RPC_ARCHIVE_URL = endpoint.url
+        REAL_URL = f"{RPC_ARCHIVE_URL}/block?height={height}"
+        start_time = time.time()
+        try:
+            async with endpoint.semaphore:
+                r = await client.get(REAL_URL, timeout=30)
+        except httpx.HTTPError as e:
+            scheduler.record_failure(endpoint)
+            print(f"Error: {e!r} @ height {height} @ {RPC_ARCHIVE_URL}")
+            continue
 
-    RPC_ARCHIVE_URL = random.choice(RPC_ARCHIVE_LINKS)
-    REAL_URL = f"{RPC_ARCHIVE_URL}/block?height={height}"
-    r = await client.get(REAL_URL, timeout=30)
-    if r.status_code != 200:
-        print(f"Error: {r.status_code} @ height {height}")
-        with open(os.path.join(current_dir, f"errors.txt"), "a") as f:
-            f.write(f"Height: {height};{r.status_code} @ {RPC_ARCHIVE_URL} @ {time.time()};{r.text}\n\n")
+        if r.status_code != 200:
+            scheduler.record_failure(endpoint, r.text)
+            print(f"Error: {r.status_code} @ height {height} @ {RPC_ARCHIVE_URL}")
+            with open(os.path.join(current_dir, f"errors.txt"), "a") as f:
+                f.write(f"Height: {height};{r.status_code} @ {RPC_ARCHIVE_URL} @ {time.time()};{r.text}\n\n")
+            continue
+
+        scheduler.record_success(endpoint, time.time() - start_time)
+        break
+    else:
         return None
 
-    block_time = ""
-    encoded_block_txs = []
-    try:
-        v = r.json()["result"]["block"]
-        block_time = v["header"]["time"]
-        encoded_block_txs = v["data"]["txs"]
-    except KeyError:
+    parsed = parse_block_response(r.content)
+    if parsed is None:
+        print(f"Error: no block in the response @ height {height} @ {RPC_ARCHIVE_URL}")
         return None
 
+    block_time, encoded_block_txs = parsed
+    cache_block(height, block_time, encoded_block_txs)
+    return to_block_data(height, block_time, encoded_block_txs)
+
+def to_block_data(height: int, block_time: str, encoded_block_txs: list[str]) -> BlockData:
     amino_txs = []
     if TX_AMINO_LENGTH_CUTTOFF_LIMIT <= 0:
         amino_txs = encoded_block_txs
@@ -104,91 +221,395 @@ async def download_block(client: httpx.AsyncClient, height: int) -> BlockData |
 
     return BlockData(height, block_time, amino_txs)
 
-async def do_mass_url_download_and_decode(block_range: list[int] | range, httpx_client):
-    if isinstance(block_range, range):
-        block_range = list(block_range)
-
-    tasks = {}
+async def download_blocks(client: httpx.AsyncClient, heights: list[int]) -> list[BlockData]:
+    """
+    Fetches many heights in one JSON-RPC batch POST. Heights missing from the batch
+    answer are retried one by one, and endpoints which reject batches are only used
+    with single GETs from then on. Heights in the local block cache are never requested.
+    Heights which still fail are left out of the result, the caller decides whether to retry.
+    """
+    values: list[BlockData] = []
+    if block_store is not None:
+        values = [bd for bd in map(cached_block, heights) if bd is not None]
+        heights = [h for h in heights if h not in block_store]
+        if len(heights) == 0:
+            return values
+
+    endpoint = scheduler.pick(min(heights))
+    if len(heights) == 1 or endpoint is None or not endpoint.supports_batch:
+        return values + await download_each(client, heights)
+
+    payload = [{"jsonrpc": "2.0", "id": h, "method": "block", "params": {"height": str(h)}} for h in heights]
     start_time = time.time()
-    for block in block_range:
-        if block > END_BLOCK:
-            break
+    results = None
+    try:
+        async with endpoint.semaphore:
+            r = await client.post(endpoint.url, json=payload, timeout=30 + len(heights))
+        if r.status_code == 200 and r.content.lstrip().startswith(b"["):
+            results = parse_block_batch(r.content)
+            scheduler.record_success(endpoint, (time.time() - start_time) / len(heights))
+        elif r.status_code in (200, 400, 404, 405, 413, 501):
+            endpoint.supports_batch = False
+            print(f"RPC {endpoint.url} rejected a batch request ({r.status_code}), using single requests")
+        else:
+            scheduler.record_failure(endpoint, r.text)
+            print(f"Error: batch {r.status_code} @ heights {min(heights)}->{max(heights)} @ {endpoint.url}")
+    except (httpx.HTTPError, ValueError) as e:
+        scheduler.record_failure(endpoint)
+        print(f"Error: batch {e!r} @ heights {min(heights)}->{max(heights)} @ {endpoint.url}")
+
+    remaining = set(heights)
+    for height, parsed in (results or {}).items():
+        if height not in remaining or parsed is None:
+            continue
+        block_time, encoded_block_txs = parsed
+        cache_block(height, block_time, encoded_block_txs)
+        values.append(to_block_data(height, block_time, encoded_block_txs))
+        remaining.discard(height)
+
+    if remaining:
+        values.extend(await download_each(client, sorted(remaining)))
+
+    return values
+
+async def download_each(client: httpx.AsyncClient, heights: list[int]) -> list[BlockData]:
+    # one failing height must not throw away the ones already downloaded
+    downloaded = await asyncio.gather(*[download_block(client, h) for h in heights], return_exceptions=True)
+    values = []
+    for height, bd in zip(heights, downloaded):
+        if isinstance(bd, BaseException):
+            print(f"Error: download_block({height}): {bd!r}")
+        elif bd is not None:
+            values.append(bd)
+    return values
+
+async def stream_download_and_save(block_range: Iterable[int], httpx_client) -> int:
+    """
+    Bounded producer/consumer pipeline. MAX_IN_FLIGHT fetchers pull heights and push
+    downloaded blocks onto a queue, a single writer drains it and saves every FLUSH_SIZE
+    blocks or FLUSH_INTERVAL seconds, whichever comes first. Returns the amount of saved blocks.
+    Heights which fail are requeued, up to RPC_MAX_ATTEMPTS rounds each.
+    """
+    heights = iter(block_range)
+    saved_blocks = 0
+    queue: asyncio.Queue[BlockData | None] = asyncio.Queue(maxsize=FLUSH_SIZE * 2)
+    retry: list[int] = []
+    failures: dict[int, int] = {}
+
+    async def fetcher():
+        while True:
+            chunk = retry[: max(RPC_BATCH_SIZE, 1)]
+            del retry[: len(chunk)]
+            if len(chunk) == 0:
+                chunk = list(itertools.islice(heights, max(RPC_BATCH_SIZE, 1)))
+            if len(chunk) == 0:
+                break
 
-        if block != 0:
-            tasks[block] = asyncio.create_task(download_block(httpx_client, block))
+            batch = [h for h in chunk if h != 0]
+            if len(batch) == 0:
+                continue
 
+            try:
+                values = await download_blocks(httpx_client, batch)
+            except Exception as e:
+                print(f"Error: download_blocks({batch[0]}->{batch[-1]}): {e}")
+                values = []
+
+            for bd in values:
+                await queue.put(bd)
+
+            downloaded = {bd.height for bd in values}
+            for h in batch:
+                if h in downloaded:
+                    continue
+                failures[h] = failures.get(h, 0) + 1
+                if failures[h] < RPC_MAX_ATTEMPTS:
+                    retry.append(h)
+                else:
+                    print(f"Error: giving up on height {h} after {failures[h]} rounds")
+
+    async def writer():
+        nonlocal saved_blocks
+        batch: list[BlockData] = []
+        last_flush = time.time()
+        done = False
+        while not done:
+            timeout = max(FLUSH_INTERVAL - (time.time() - last_flush), 0)
+            try:
+                bd = await asyncio.wait_for(queue.get(), timeout=timeout)
+                if bd is None:
+                    done = True
+                else:
+                    batch.append(bd)
+            except asyncio.TimeoutError:
+                pass
+
+            if batch and (done or len(batch) >= FLUSH_SIZE or time.time() - last_flush >= FLUSH_INTERVAL):
+                start_time = time.time()
+                try:
+                    inserted = await save_values_to_sql(batch)
+                    saved_blocks += inserted
+                    heights = [bd.height for bd in batch]
+                    print(f"Saved #{inserted} blocks in {round(time.time() - start_time, 4)} seconds ({min(heights)}->{max(heights)})")
+                except Exception as e:
+                    print(f"Error: writer(): {e}")
+                    traceback.print_exc()
+                batch = []
+
+            if not batch:
+                last_flush = time.time()
+
+    writer_task = asyncio.create_task(writer())
+    for e in await asyncio.gather(*[fetcher() for _ in range(MAX_IN_FLIGHT)], return_exceptions=True):
+        if isinstance(e, BaseException):
+            print(f"Error: fetcher(): {e!r}")
+    await queue.put(None)
+    await writer_task
+    return saved_blocks
+
+def new_httpx_client() -> httpx.AsyncClient:
+    return create_async_client(
+        max_connections=chain_config.get("HTTP_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=chain_config.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", 50),
+        keepalive_expiry=chain_config.get("HTTP_KEEPALIVE_EXPIRY", 30),
+        http2=chain_config.get("HTTP2", False),
+    )
+
+async def run_with_async_db(task):
+    global adb
+
+    adb = await AsyncDatabase.connect(**DB_PARAMS, pool_size=DB_POOL_SIZE, partition_size=PARTITION_SIZE)
     try:
-        values = await asyncio.gather(*tasks.values())
-        if not all(x is None for x in values):
-            save_values_to_sql(values)
-            print(f"Finished #{len(block_range)} blocks in {round(time.time() - start_time, 4)} seconds ({block_range[0]}->{block_range[-1]})")
-    except Exception as e:
-        print(f"Error: main(): {e}")
-        traceback.print_exc()
+        await task()
+    finally:
+        await adb.close()
 
 async def main():
-    global START_BLOCK, END_BLOCK
+    async with new_httpx_client() as httpx_client:
+        if TASK == "sync":
+            await follow_chain_tip(httpx_client)
+            return
+
+        bulk_load = BULK_LOAD
+        while True:
+            finished = await download_to_chain_tip(httpx_client)
+            if bulk_load and finished:
+                await asyncio.get_running_loop().run_in_executor(None, build_deferred_indexes)
+                bulk_load = False
+
+            print("Sleeping for more blocks.")
+            await asyncio.sleep(SYNC_POLL_INTERVAL)
 
+def build_deferred_indexes():
+    print("Building the txs indexes deferred by BULK_LOAD...")
+    start_time = time.time()
+    db.build_indexes()
+    db.optimize_db(vacuum=True)
+    print(f"Built the indexes in {round(time.time() - start_time, 2)} seconds")
+
+async def follow_chain_tip(httpx_client: httpx.AsyncClient):
+    """
+    sync mode: backfills to the tip over RPC, then ingests every NewBlock event from the
+    websocket as it arrives. After a disconnect the gap is backfilled before resubscribing.
+    Without a websocket endpoint (or the websockets package) this polls the tip instead.
+    """
+    global END_BLOCK, decode_queue
+
+    decode_queue = asyncio.Queue()
+    decode_task = asyncio.create_task(decode_stage(decode_queue))
+    try:
+        await _follow_chain_tip(httpx_client)
+    finally:
+        decode_task.cancel()
+
+async def _follow_chain_tip(httpx_client: httpx.AsyncClient):
+    global END_BLOCK
+
+    attempt = 0
     while True:
-        last_saved_block = db.get_latest_saved_block()
-        latest_saved_height = 0
-        if last_saved_block is not None:
-            latest_saved_height = last_saved_block.height
+        await download_to_chain_tip(httpx_client)
+        if not WEBSOCKET_URL or websockets is None:
+            await asyncio.sleep(SYNC_POLL_INTERVAL)
+            continue
 
-        current_chain_height = get_latest_chain_height(RPC_ARCHIVE=RPC_ARCHIVE_LINKS[0])
-        print(f"Last saved: {latest_saved_height:,} & Chain height: {current_chain_height:,}")
+        last_height = END_BLOCK
+        try:
+            print(f"Subscribing to new blocks @ {WEBSOCKET_URL}")
+            async for block in subscribe_new_blocks(WEBSOCKET_URL, idle_timeout=WEBSOCKET_IDLE_TIMEOUT):
+                attempt = 0
+                height = int(block["header"]["height"])
+                if height <= last_height:
+                    continue
+
+                if height > last_height + 1:
+                    print(f"Missed blocks {last_height + 1:,}->{height - 1:,} on the websocket, backfilling")
+                    await download_range(httpx_client, last_height + 1, height - 1)
+
+                block_time, encoded_block_txs = block["header"]["time"], block["data"]["txs"] or []
+                cache_block(height, block_time, encoded_block_txs)
+                await save_values_to_sql([to_block_data(height, block_time, encoded_block_txs)])
+                last_height = END_BLOCK = height
+        except Exception as e:
+            delay = backoff_delay(attempt, 1, 30)
+            attempt += 1
+            print(f"Error: websocket {e!r}, backfilling & reconnecting in {round(delay, 2)} seconds")
+            await asyncio.sleep(delay)
+
+async def decode_stage(queue: asyncio.Queue):
+    """
+    sync mode: decodes the ranges the writer saved on a separate thread, so the next blocks
+    download while the previous ones decode. Ranges queued up while a decode runs are merged
+    into one, so a slow decode catches up in bigger batches instead of falling further behind.
+    """
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="decode") as executor:
+        while True:
+            lowest_height, highest_height = await queue.get()
+            while not queue.empty():
+                start, end = queue.get_nowait()
+                lowest_height = min(lowest_height, start)
+                highest_height = max(highest_height, end)
+
+            start_time = time.time()
+            try:
+                await loop.run_in_executor(executor, do_decode, lowest_height, highest_height)
+                print(f"Decoded {lowest_height:,}->{highest_height:,} in {round(time.time() - start_time, 4)} seconds")
+            except Exception as e:
+                print(f"Error: decode_stage(): {e}")
+                traceback.print_exc()
 
-        if END_BLOCK > current_chain_height:
-            END_BLOCK = current_chain_height
+async def download_to_chain_tip(httpx_client: httpx.AsyncClient) -> bool:
+    """False when the chain height could not be fetched, so nothing was downloaded."""
+    global START_BLOCK, END_BLOCK
 
-        if TASK == "sync":
-            START_BLOCK = latest_saved_height
-            END_BLOCK = current_chain_height
+    last_saved_block = await adb.get_latest_saved_block()
+    latest_saved_height = 0
+    if last_saved_block is not None:
+        latest_saved_height = last_saved_block.height
 
-        GROUP_END_BLOCK = END_BLOCK - (END_BLOCK % GROUPING)
-        print(f"Bulk Blocks: {START_BLOCK:,}->{END_BLOCK:,}")
+    current_chain_height = await scheduler.refresh_status(httpx_client)
+    if current_chain_height < 0:
+        print("Error: no RPC endpoint returned the chain height")
+        return False
 
-        async with httpx.AsyncClient() as httpx_client:
-            if END_BLOCK - START_BLOCK <= GROUPING:
-                await do_mass_url_download_and_decode(range(START_BLOCK, current_chain_height + 1), httpx_client)
-            else:
-                num_groups = (GROUP_END_BLOCK - START_BLOCK) // GROUPING + 1
-                for i in range(num_groups):
-                    block_heights = [bh for bh in range(START_BLOCK + i * GROUPING, START_BLOCK + (i + 1) * GROUPING)]
-                    await do_mass_url_download_and_decode(block_heights, httpx_client)
+    print(f"Last saved: {latest_saved_height:,} & Chain height: {current_chain_height:,}")
 
-                remainder_blocks = range(GROUP_END_BLOCK, END_BLOCK + 1)
-                if remainder_blocks:
-                    await do_mass_url_download_and_decode(remainder_blocks, httpx_client)
+    if END_BLOCK > current_chain_height:
+        END_BLOCK = current_chain_height
 
-        print("Sleeping for more blocks.")
-        time.sleep(10)
+    if TASK == "sync":
+        START_BLOCK = latest_saved_height
+        END_BLOCK = current_chain_height
 
-def decode_and_save_updated(to_decode: list[dict]):
-    global db
+    print(f"Bulk Blocks: {START_BLOCK:,}->{END_BLOCK:,}")
+    await download_range(httpx_client, START_BLOCK, END_BLOCK)
+    print(scheduler.summary())
+    return True
 
+async def download_range(httpx_client: httpx.AsyncClient, start_height: int, end_height: int) -> int:
     start_time = time.time()
+    saved = await adb.get_saved_heights(start_height, end_height)
+    already_saved = sum(saved)
+    if already_saved > 0:
+        print(f"Skipping {already_saved:,} already saved blocks")
+    pending_heights = (h for h in range(start_height, end_height + 1) if not saved[h - start_height])
+
+    saved_blocks = await stream_download_and_save(pending_heights, httpx_client)
+    print(f"Finished {start_height:,}->{end_height:,} in {round(time.time() - start_time, 4)} seconds")
+    return saved_blocks
+
+async def worker():
+    """
+    Worker mode for supervisor.py: reads "<start> <end>" chunks from stdin and reports
+    every finished chunk back on stdout, until stdin is closed. Chunks are clamped to the
+    chain tip, the reported end is the last height actually downloaded.
+    """
+    global START_BLOCK, END_BLOCK
 
-    _rand = str(uuid.uuid4())
-    DUMPFILE = os.path.join(tmp_decode_dir, f"in-{_rand}.json")
-    OUTFILE = os.path.join(tmp_decode_dir, f"out-{_rand}.json")
+    async with new_httpx_client() as httpx_client:
+        # also fills in every node's archive depth & tip for the scheduler
+        chain_height = await scheduler.refresh_status(httpx_client)
+        for line in sys.stdin:
+            if len(line.split()) != 2:
+                continue
+
+            START_BLOCK, END_BLOCK = map(int, line.split())
+            if END_BLOCK > chain_height:
+                chain_height = max(chain_height, await scheduler.refresh_status(httpx_client))
+            if chain_height < 0:
+                print("Error: no RPC endpoint returned the chain height")
+                # the supervisor requeues the chunk & restarts the worker
+                exit(1)
+            if END_BLOCK > chain_height:
+                print(f"Clamping {START_BLOCK:,}->{END_BLOCK:,} to the chain height {chain_height:,}")
+                END_BLOCK = chain_height
+
+            saved_blocks = 0
+            if START_BLOCK <= END_BLOCK:
+                saved_blocks = await download_range(httpx_client, START_BLOCK, END_BLOCK)
+            built_in_print(f"{WORKER_CHUNK_DONE} {START_BLOCK} {max(END_BLOCK, START_BLOCK - 1)} {saved_blocks}", flush=True)
+
+def to_message_rows(tx_id: int, height: int, walked: list[tuple]) -> list[tuple]:
+    rows = []
+    for msg_index, parent_index, msg, msg_sender in walked:
+        msg_type = msg.get("@type", "")
+        contract = msg.get("contract")
+        # wrapped messages get their own rows, pointing back with parent_index
+        payload = {k: v for k, v in msg.items() if k != WRAPPERS.get(msg_type)}
+        addresses = sorted(extractor.addresses(payload))
+        rows.append((tx_id, height, msg_index, parent_index, msg_type, msg_sender, contract if isinstance(contract, str) else None, addresses, json.dumps(payload)))
+    return rows
+
+def backfill_messages(lowest_height: int, highest_height: int):
+    """messages task: fills the messages table from txs which were decoded before it existed."""
+    start_time = time.time()
+    total_txs = 0
+    message_rows = []
+    # the WITH HOLD cursor materializes its whole result on commit, so one block limit at a time
+    for start in range(lowest_height, highest_height + 1, COSMOS_PROTO_DECODE_BLOCK_LIMIT):
+        end = min(start + COSMOS_PROTO_DECODE_BLOCK_LIMIT - 1, highest_height)
+        for tx in db.get_decoded_txs_in_range(start, end):
+            total_txs += 1
+            walked = extractor.walk(tx.height, json.loads(tx.tx_json)["body"]["messages"])
+            message_rows.extend(to_message_rows(tx.id, tx.height, walked))
+
+            if len(message_rows) >= DECODE_LIMIT:
+                db.insert_messages(message_rows)
+                db.commit()
+                message_rows = []
+
+        db.insert_messages(message_rows)
+        db.commit()
+        message_rows = []
+        print(f"Wrote the messages of {total_txs:,} txs up to height {end:,}")
+    extractor.flush()
+    print(f"Wrote the messages of {total_txs:,} txs in {round(time.time() - start_time, 2)} seconds")
+
+def decode_and_save_updated(to_decode: list[dict], heights: dict[int, int]):
+    """
+    heights maps every tx id in to_decode to its block height (from the rows do_decode already loaded).
+    """
+    global db
 
-    with open(DUMPFILE, "w") as f:
-        json.dump(to_decode, f)
+    start_time = time.time()
 
-    values = run_decode_file(COSMOS_PROTO_DECODER_BINARY_FILE, DUMPFILE, OUTFILE)
+    values = decoder.decode(to_decode)
 
+    rows = []
+    message_rows = []
     for data in values:
         tx_id = data["id"]
-        tx_data = json.loads(data["tx"])
+        tx_data = data["tx"] if isinstance(data["tx"], dict) else json.loads(data["tx"])
 
-        tx = db.get_tx(tx_id)
-        if tx is None:
+        height = heights.get(tx_id)
+        if height is None:
             continue
 
-        height = tx.height
-
-        sender = get_sender(height, tx_data["body"]["messages"][0], "juno", "junovaloper")
+        walked = extractor.walk(height, tx_data["body"]["messages"])
+        # the first message's signer, else the first sender found in any (wrapped) message
+        sender = walked[0][3] if walked else None
+        if sender is None:
+            sender = next((msg_sender for _, _, _, msg_sender in walked if msg_sender is not None), None)
         if sender is None:
             print("No sender found for tx: ", tx_id, "at height: ", height)
             sender = "UNKNOWN"
@@ -203,24 +624,28 @@ def decode_and_save_updated(to_decode: list[dict]):
         msg_types_list = list(msg_types.keys())
         msg_types_list.sort()
 
-        for i in range(60):
-            try:
-                db.update_tx(tx_id, json.dumps(tx_data), json.dumps(msg_types_list), sender)
-                break
-            except Exception as e:
-                random_sleep = random.random() + 0.5
-                print(f"[!] Error: decode_and_save_updated(): {e}. Waiting {random_sleep} seconds to try again")
-                time.sleep(random_sleep)
-                continue
+        rows.append((tx_id, height, json.dumps(tx_data), json.dumps(msg_types_list), sender))
+
+        message_rows.extend(to_message_rows(tx_id, height, walked))
+
+    extractor.flush()
 
-    db.commit()
+    for i in range(60):
+        try:
+            db.update_txs(rows)
+            db.insert_messages(message_rows)
+            db.commit()
+            break
+        except Exception as e:
+            db.rollback()
+            random_sleep = random.random() + 0.5
+            print(f"[!] Error: decode_and_save_updated(): {e}. Waiting {random_sleep} seconds to try again")
+            time.sleep(random_sleep)
+            continue
 
     if TASK == "decode":
         print(f"Time: Decoded & stored ({len(to_decode)} Txs): {time.time() - start_time}")
 
-    os.remove(DUMPFILE)
-    os.remove(OUTFILE)
-
 def do_decode(lowest_height: int, highest_height: int):
     global db
 
@@ -229,11 +654,12 @@ def do_decode(lowest_height: int, highest_height: int):
         groups.append(DecodeGroup(lowest_height - 1, highest_height))
         print(f"Group: {lowest_height-1}->{highest_height}")
     else:
+        # disjoint inclusive ranges: with decode workers a boundary height would go to two of them
         for i in range(((highest_height - lowest_height) // COSMOS_PROTO_DECODE_BLOCK_LIMIT + 1) - 1):
-            groups.append(DecodeGroup(lowest_height + i * COSMOS_PROTO_DECODE_BLOCK_LIMIT, lowest_height + (i + 1) * COSMOS_PROTO_DECODE_BLOCK_LIMIT))
+            groups.append(DecodeGroup(lowest_height + i * COSMOS_PROTO_DECODE_BLOCK_LIMIT, lowest_height + (i + 1) * COSMOS_PROTO_DECODE_BLOCK_LIMIT - 1))
 
         if len(groups) > 0 and groups[-1].end < highest_height:
-            groups.append(DecodeGroup(groups[-1].end, highest_height))
+            groups.append(DecodeGroup(groups[-1].end + 1, highest_height))
 
     print(f"Groups: {len(groups):,}")
     print(f"Total Blocks: {highest_height - lowest_height:,}")
@@ -243,62 +669,97 @@ def do_decode(lowest_height: int, highest_height: int):
         print("No latest block found. Cannot decode. Exiting.")
         exit(1)
 
+    pending: set[Future] = set()
     for group in groups:
         start_height = group.start
         end_height = group.end
         print(f"Decoding Group: {start_height:,}->{end_height:,} ({(end_height - start_height):,} blocks)")
 
-        txs = db.get_non_decoded_txs_in_range(start_height, end_height)
-        print(f"Total non decoded Txs in Blocks: {start_height:,}->{end_height:,}: Txs #:{len(txs):,}")
-
+        total_txs = 0
         to_decode = []
-        for tx in txs:
-            if len(tx.tx_json) == 0:
-                to_decode.append({"id": tx.id, "tx": tx.tx_amino})
+        heights = {}
+        for tx in db.get_non_decoded_txs_in_range(start_height, end_height):
+            total_txs += 1
+            to_decode.append({"id": tx.id, "tx": tx.tx_amino})
+            heights[tx.id] = tx.height
 
             if len(to_decode) >= DECODE_LIMIT:
-                decode_and_save_updated(to_decode)
-                to_decode.clear()
+                submit_decode(to_decode, heights, pending)
+                to_decode = []
+                heights = {}
 
         if len(to_decode) > 0:
-            decode_and_save_updated(to_decode)
-            to_decode.clear()
-
-def save_values_to_sql(values: list[BlockData]):
-    global db
-
-    for bd in values:
-        if bd is None:
-            continue
-
-        height = bd.height
-        block_time = bd.block_time
-        amino_txs = bd.encoded_txs
-
-        sql_tx_ids = []
-        for amino_tx in amino_txs:
-            unique_id = db.insert_tx(height, amino_tx)
-            sql_tx_ids.append(unique_id)
+            submit_decode(to_decode, heights, pending)
 
-        db.insert_block(height, block_time, sql_tx_ids)
+        print(f"Total non decoded Txs in Blocks: {start_height:,}->{end_height:,}: Txs #:{total_txs:,}")
 
-    db.commit()
+    for future in as_completed(pending):
+        future.result()
 
-    if TASK == "sync":
+def init_decode_worker():
+    # every decode worker process gets its own connection
+    global db
+    db = Database(**DB_PARAMS)
+
+def submit_decode(to_decode: list[dict], heights: dict[int, int], pending: set[Future]):
+    """
+    Decodes & saves a batch inline, or on the decode worker pool when COSMOS_PROTO_DECODE_WORKERS > 1.
+    At most 2 batches per worker are queued, so reading txs never runs far ahead of decoding.
+    """
+    global decode_pool
+
+    if DECODE_WORKERS <= 1:
+        decode_and_save_updated(to_decode, heights)
+        return
+
+    if decode_pool is None:
+        decode_pool = ProcessPoolExecutor(
+            max_workers=DECODE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_decode_worker,
+        )
+
+    pending.add(decode_pool.submit(decode_and_save_updated, to_decode, heights))
+    while len(pending) >= DECODE_WORKERS * 2:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            future.result()
+
+async def save_values_to_sql(values: list[BlockData]) -> int:
+    """Returns the amount of blocks inserted, heights which were already saved are skipped."""
+    saved = await adb.insert_blocks(values)
+
+    if TASK == "sync" and decode_queue is not None:
         heights = [v.height for v in values if v is not None]
         if not heights:
             print("Error: no heights found in range")
-            return
+            return 0
 
-        lowest_height = min(heights)
-        latest_height = max(heights)
-
-        do_decode(lowest_height, latest_height)
+        decode_queue.put_nowait((min(heights), max(heights)))
+    return len(saved)
 
 if __name__ == "__main__":
-    db = Database(db="your_db_name", user="your_username", password="your_password", host="your_host", port="your_port")
-    db.create_tables()
-    db.optimize_tables()
+    db = Database(**DB_PARAMS)
+    try:
+        db.create_tables(jsonb=TX_JSON_STORAGE == "jsonb", partition_size=PARTITION_SIZE, binary=TX_RAW_STORAGE == "bytea")
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+    if TX_JSON_STORAGE == "jsonb" and not db.jsonb:
+        print("Migrating txs.tx_json & msg_types to JSONB, this rewrites the txs table...")
+        start_time = time.time()
+        db.migrate_tx_json_to_jsonb()
+        print(f"Migrated to JSONB in {round(time.time() - start_time, 2)} seconds")
+    if TX_RAW_STORAGE == "bytea" and not db.binary:
+        print("Migrating txs.tx_amino & tx_hash to BYTEA, this rewrites the txs table...")
+        start_time = time.time()
+        db.migrate_tx_raw_to_bytea()
+        print(f"Migrated to BYTEA in {round(time.time() - start_time, 2)} seconds")
+    if BUILD_INDEXES:
+        build_deferred_indexes()
+        exit(0)
+    db.optimize_tables(deferred_tables=("txs",) if BULK_LOAD and TASK == "download" else ())
     db.optimize_db(vacuum=False)
 
     if TASK == "decode":
@@ -306,6 +767,21 @@ if __name__ == "__main__":
         do_decode(START_BLOCK, END_BLOCK)
         exit(1)
 
+    elif TASK == "messages":
+        print(f"Writing the messages of all decoded Txs in the range {START_BLOCK} - {END_BLOCK}")
+        backfill_messages(START_BLOCK, END_BLOCK)
+        exit(1)
+
+    elif TASK == "archive":
+        print(f"Moving tx_amino of decoded Txs in the range {START_BLOCK} - {END_BLOCK} to txs_raw")
+        start_time = time.time()
+        total = 0
+        for start in range(START_BLOCK, END_BLOCK + 1, COSMOS_PROTO_DECODE_BLOCK_LIMIT):
+            total += db.archive_decoded_txs(start, min(start + COSMOS_PROTO_DECODE_BLOCK_LIMIT - 1, END_BLOCK))
+            print(f"Archived {total:,} txs up to height {min(start + COSMOS_PROTO_DECODE_BLOCK_LIMIT - 1, END_BLOCK):,}")
+        print(f"Archived {total:,} txs in {round(time.time() - start_time, 2)} seconds, VACUUM txs to reuse the space")
+        exit(1)
+
     elif TASK == "missing":
         earliest_block = BlockData(START_BLOCK, "", [])
         latest_saved_block = BlockData(END_BLOCK, "", [])
@@ -325,11 +801,17 @@ if __name__ == "__main__":
             print("No missing blocks in this range")
 
         print("Waiting on non decoded txs in range query...")
-        failed_to_decode_txs = db.get_non_decoded_txs_in_range(earliest_block.height, latest_saved_block.height)
-        if len(failed_to_decode_txs) > 0:
+        failed_heights = set()
+        failed_tx_ids = set()
+        # ids & heights only: the tx_amino of every undecoded tx is not needed to list them
+        for tx_id, height in db.get_non_decoded_tx_ids_in_range(earliest_block.height, latest_saved_block.height):
+            failed_heights.add(height)
+            failed_tx_ids.add(tx_id)
+
+        if len(failed_tx_ids) > 0:
             print("Missing txs (ones which are failed to be decoded)...")
-            heights = sorted(set(tx.height for tx in failed_to_decode_txs))
-            tx_ids = sorted(set(tx.id for tx in failed_to_decode_txs))
+            heights = sorted(failed_heights)
+            tx_ids = sorted(failed_tx_ids)
             with open(os.path.join(current_dir, "missing_txs.json"), "w") as f:
                 json.dump({"heights": heights, "tx_ids": tx_ids}, f)
         else:
@@ -337,7 +819,8 @@ if __name__ == "__main__":
 
         exit(1)
 
+    block_store = open_block_store()
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    loop.run_until_complete(main())
+    loop.run_until_complete(run_with_async_db(worker if WORKER_MODE else main))
     loop.close()
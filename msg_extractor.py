@@ -0,0 +1,145 @@
+import os
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+# first key found is the sender (MultibankSend is registered with its own path below)
+SENDER_KEYS = [
+    "sender",
+    "delegator_address",
+    "from_address",
+    "grantee",
+    "voter",
+    "signer",
+    "depositor",
+    "proposer",
+    "validator_addr",
+    "validator_address",
+]
+
+# wrappers whose inner messages are walked as well: @type -> key of the inner Any list
+WRAPPERS = {
+    "/cosmos.authz.v1beta1.MsgExec": "msgs",
+    "/cosmos.gov.v1.MsgSubmitProposal": "messages",
+    "/cosmos.group.v1.MsgSubmitProposal": "messages",
+}
+
+# bech32 data of a 20 byte address (32 chars) + checksum (6 chars), contracts are longer
+ADDRESS_DATA_LENGTH = 38
+
+
+class MsgExtractor:
+    """
+    Finds the sender of every message through a field path cached per @type: the first
+    message of a type resolves it (SENDER_KEYS, then any field holding a wallet/valoper
+    address), every later one is a dict lookup. Types without a sender are written to
+    no_sender_error.txt once, in batches.
+    """
+
+    def __init__(self, wallet_prefix: str, valoper_prefix: str, log_batch: int = 100):
+        self.wallet_prefix = wallet_prefix
+        self.valoper_prefix = valoper_prefix
+        self.log_batch = log_batch
+
+        self.paths: dict[str, tuple] = {
+            "/cosmos.bank.v1beta1.MsgMultiSend": ("inputs", 0, "address"),
+        }
+        self.unknown_types: set[str] = set()
+        self.unknown_log: list[str] = []
+
+    def register(self, msg_type: str, path: tuple):
+        """path of keys / list indexes to the sender, e.g. ("inputs", 0, "address")"""
+        self.paths[msg_type] = path
+
+    def is_address(self, value) -> bool:
+        if not isinstance(value, str):
+            return False
+        for prefix in (self.wallet_prefix, self.valoper_prefix):
+            if value.startswith(prefix) and len(value) <= len(prefix) + ADDRESS_DATA_LENGTH:
+                return True
+        return False
+
+    def _resolve(self, msg: dict, require_address: bool = False) -> tuple | None:
+        for key in SENDER_KEYS:
+            if key in msg and (not require_address or self.is_address(msg[key])):
+                return (key,)
+        for key, value in msg.items():
+            if self.is_address(value):
+                return (key,)
+        return None
+
+    def sender(self, height: int, msg: dict) -> str | None:
+        msg_type = msg.get("@type", "")
+        path = self.paths.get(msg_type)
+        if path is None:
+            path = self._resolve(msg)
+            if path is None:
+                self._log_unknown(height, msg_type, msg)
+                return None
+            self.paths[msg_type] = path
+
+        value = self._lookup(msg, path)
+        if not self.is_address(value):
+            # the cached path is empty or not an address in this message, scan it like a new type
+            fallback = self._resolve(msg, require_address=True)
+            if fallback is not None:
+                return self._lookup(msg, fallback)
+        return value if isinstance(value, str) and value else None
+
+    @staticmethod
+    def _lookup(msg: dict, path: tuple):
+        value = msg
+        try:
+            for key in path:
+                value = value[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+        return value
+
+    def walk(self, height: int, messages: list[dict]) -> list[tuple[int, int | None, dict, str | None]]:
+        """
+        (msg_index, parent_index, msg, sender) of every message, wrapped ones included.
+        Indexes count depth first over the whole tx, parent_index is the wrapper's index.
+        """
+        out = []
+
+        def visit(msg: dict, parent_index: int | None):
+            index = len(out)
+            out.append((index, parent_index, msg, self.sender(height, msg)))
+            inner_key = WRAPPERS.get(msg.get("@type", ""))
+            if inner_key is not None:
+                for inner in msg.get(inner_key) or []:
+                    if isinstance(inner, dict):
+                        visit(inner, index)
+
+        for msg in messages:
+            visit(msg, None)
+        return out
+
+    def addresses(self, msg) -> set[str]:
+        """Every wallet / valoper address anywhere in a message, nested ones included."""
+        found = set()
+        stack = [msg]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                stack.extend(value.values())
+            elif isinstance(value, list):
+                stack.extend(value)
+            elif self.is_address(value):
+                found.add(value)
+        return found
+
+    def _log_unknown(self, height: int, msg_type: str, msg: dict):
+        if msg_type in self.unknown_types:
+            return
+        self.unknown_types.add(msg_type)
+        self.unknown_log.append(f"Height:{height} -" + str(msg) + "\n\n")
+        if len(self.unknown_log) >= self.log_batch:
+            self.flush()
+
+    def flush(self):
+        if len(self.unknown_log) == 0:
+            return
+        with open(os.path.join(current_dir, "no_sender_error.txt"), "a") as f:
+            f.writelines(self.unknown_log)
+        self.unknown_log = []
@@ -0,0 +1,400 @@
+"""
+In-process decoder of base64 TxRaw into the same proto3 JSON the decoder binary writes
+(snake_case field names, defaults emitted, 64 bit ints as strings, bytes as base64, enums by name).
+
+Message types are plain field tables in MESSAGES, keyed by their full proto name. Anything not
+registered raises UnknownTypeError so the tx can go to the decoder binary instead. More types
+can be added at runtime with register_message / register_enum.
+"""
+
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# kind: string, bytes, uint64, int64, uint32, int32, bool, enum, int, dec, rawjson, timestamp, message, any
+# (int is a math.Int string, "0" when empty like the Go marshaller)
+# type_name: the message or enum name for message / enum kinds
+# nullable: False for gogoproto (nullable) = false messages, emitted as their zero value when absent
+# oneof: only emitted when set
+Field = namedtuple("Field", ["number", "name", "kind", "repeated", "type_name", "nullable", "oneof"], defaults=[False, "", True, False])
+
+
+class UnknownTypeError(Exception):
+    pass
+
+
+MESSAGES: dict[str, dict[int, Field]] = {}
+ENUMS: dict[str, dict[int, str]] = {}
+
+LEGACY_DEC_PRECISION = 18
+
+WIRE_VARINT = 0
+WIRE_FIXED64 = 1
+WIRE_LEN = 2
+WIRE_FIXED32 = 5
+
+VARINT_KINDS = ("uint64", "int64", "uint32", "int32", "bool", "enum")
+
+
+def register_message(name: str, fields: list[Field]):
+    """name without the leading / of the type url, e.g. cosmos.bank.v1beta1.MsgSend"""
+    MESSAGES[name.lstrip("/")] = {f.number: f for f in fields}
+
+
+def register_enum(name: str, values: dict[int, str]):
+    ENUMS[name] = values
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated varint")
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 70:
+            raise ValueError("varint too long")
+
+
+def _iter_fields(data: bytes):
+    """Yields (field number, wire type, value): ints for varint & fixed, bytes for length delimited."""
+    pos = 0
+    end = len(data)
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == WIRE_VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == WIRE_LEN:
+            length, pos = _read_varint(data, pos)
+            if pos + length > end:
+                raise ValueError("truncated field")
+            value = data[pos : pos + length]
+            pos += length
+        elif wire_type == WIRE_FIXED64:
+            value = int.from_bytes(data[pos : pos + 8], "little")
+            pos += 8
+        elif wire_type == WIRE_FIXED32:
+            value = int.from_bytes(data[pos : pos + 4], "little")
+            pos += 4
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+        yield number, wire_type, value
+
+
+def _signed(value: int, bits: int) -> int:
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+def _legacy_dec(raw: str) -> str:
+    # LegacyDec goes over the wire as its integer form, its JSON is the 18 decimals string
+    if raw == "":
+        raw = "0"
+    negative = raw.startswith("-")
+    digits = raw.lstrip("-").rjust(LEGACY_DEC_PRECISION + 1, "0")
+    return ("-" if negative else "") + digits[:-LEGACY_DEC_PRECISION] + "." + digits[-LEGACY_DEC_PRECISION:]
+
+
+def _timestamp(data: bytes) -> str:
+    seconds, nanos = 0, 0
+    for number, wire_type, value in _iter_fields(data):
+        if number in (1, 2) and wire_type != WIRE_VARINT:
+            raise UnknownTypeError(f"google.protobuf.Timestamp field {number} has wire type {wire_type}")
+        if number == 1:
+            seconds = _signed(value, 64)
+        elif number == 2:
+            nanos = _signed(value, 32)
+    text = datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    if nanos:
+        frac = f"{nanos:09d}"
+        while frac.endswith("000"):
+            frac = frac[:-3]
+        text += "." + frac
+    return text + "Z"
+
+
+def _default(field: Field):
+    if field.repeated:
+        return []
+    kind = field.kind
+    if kind in ("string", "bytes"):
+        return ""
+    if kind in ("uint64", "int64", "int"):
+        return "0"
+    if kind in ("uint32", "int32"):
+        return 0
+    if kind == "bool":
+        return False
+    if kind == "enum":
+        return ENUMS[field.type_name].get(0, 0)
+    if kind == "dec":
+        return _legacy_dec("0")
+    if kind == "message" and not field.nullable:
+        return decode_message(field.type_name, b"")
+    return None
+
+
+def _scalar(field: Field, wire_type: int, value):
+    kind = field.kind
+    # the schema does not match the tx, it has to go to the decoder binary
+    if wire_type != (WIRE_VARINT if kind in VARINT_KINDS else WIRE_LEN):
+        raise UnknownTypeError(f"{field.name} ({kind}) has wire type {wire_type}")
+    if kind == "string":
+        return value.decode()
+    if kind == "bytes":
+        return base64.b64encode(value).decode()
+    if kind == "uint64":
+        return str(value)
+    if kind == "int64":
+        return str(_signed(value, 64))
+    if kind == "uint32":
+        return value & 0xFFFFFFFF
+    if kind == "int32":
+        return _signed(value, 32)
+    if kind == "bool":
+        return value != 0
+    if kind == "enum":
+        return ENUMS[field.type_name].get(value, value)
+    if kind == "int":
+        return value.decode() or "0"
+    if kind == "dec":
+        return _legacy_dec(value.decode())
+    if kind == "rawjson":
+        return json.loads(value) if value else None
+    if kind == "timestamp":
+        return _timestamp(value)
+    if kind == "message":
+        return decode_message(field.type_name, value)
+    if kind == "any":
+        return decode_any(value)
+    raise ValueError(f"unknown field kind {kind}")
+
+
+def _unpack_packed(field: Field, value: bytes) -> list:
+    items = []
+    pos = 0
+    while pos < len(value):
+        v, pos = _read_varint(value, pos)
+        items.append(_scalar(field, WIRE_VARINT, v))
+    return items
+
+
+def decode_message(name: str, data: bytes) -> dict:
+    fields = MESSAGES.get(name)
+    if fields is None:
+        raise UnknownTypeError(name)
+
+    values: dict[int, object] = {}
+    for number, wire_type, value in _iter_fields(data):
+        field = fields.get(number)
+        if field is None:
+            # a field this table does not know about: the schema is out of date for this tx
+            raise UnknownTypeError(f"{name} field {number}")
+
+        if field.repeated:
+            items = values.setdefault(number, [])
+            if wire_type == WIRE_LEN and field.kind in VARINT_KINDS:
+                items.extend(_unpack_packed(field, value))
+            else:
+                items.append(_scalar(field, wire_type, value))
+        else:
+            values[number] = _scalar(field, wire_type, value)
+
+    # output in declaration order, like the binary
+    out = {}
+    for number, field in fields.items():
+        if number in values:
+            out[field.name] = values[number]
+        elif not field.oneof:
+            out[field.name] = _default(field)
+    return out
+
+
+def decode_any(data: bytes) -> dict:
+    type_url, value = "", b""
+    for number, wire_type, v in _iter_fields(data):
+        if number in (1, 2) and wire_type != WIRE_LEN:
+            raise UnknownTypeError(f"google.protobuf.Any field {number} has wire type {wire_type}")
+        if number == 1:
+            type_url = v.decode()
+        elif number == 2:
+            value = v
+    return {"@type": type_url, **decode_message(type_url.lstrip("/"), value)}
+
+
+def decode_tx(tx_amino: str) -> dict:
+    """base64 TxRaw -> {"body", "auth_info", "signatures"}. Raises UnknownTypeError or ValueError."""
+    raw = decode_message("cosmos.tx.v1beta1.TxRaw", base64.b64decode(tx_amino))
+    return {
+        "body": decode_message("cosmos.tx.v1beta1.TxBody", base64.b64decode(raw["body_bytes"])),
+        "auth_info": decode_message("cosmos.tx.v1beta1.AuthInfo", base64.b64decode(raw["auth_info_bytes"])),
+        "signatures": raw["signatures"],
+    }
+
+
+def F(number: int, name: str, kind: str = "string", type_name: str = "", repeated: bool = False, nullable: bool = True, oneof: bool = False) -> Field:
+    return Field(number, name, kind, repeated, type_name, nullable, oneof)
+
+
+COIN = "cosmos.base.v1beta1.Coin"
+
+register_enum(
+    "cosmos.tx.signing.v1beta1.SignMode",
+    {
+        0: "SIGN_MODE_UNSPECIFIED",
+        1: "SIGN_MODE_DIRECT",
+        2: "SIGN_MODE_TEXTUAL",
+        3: "SIGN_MODE_DIRECT_AUX",
+        127: "SIGN_MODE_LEGACY_AMINO_JSON",
+        191: "SIGN_MODE_EIP_191",
+    },
+)
+register_enum(
+    "cosmos.gov.VoteOption",
+    {
+        0: "VOTE_OPTION_UNSPECIFIED",
+        1: "VOTE_OPTION_YES",
+        2: "VOTE_OPTION_ABSTAIN",
+        3: "VOTE_OPTION_NO",
+        4: "VOTE_OPTION_NO_WITH_VETO",
+    },
+)
+
+# tx envelope
+register_message("cosmos.tx.v1beta1.TxRaw", [F(1, "body_bytes", "bytes"), F(2, "auth_info_bytes", "bytes"), F(3, "signatures", "bytes", repeated=True)])
+register_message(
+    "cosmos.tx.v1beta1.TxBody",
+    [
+        F(1, "messages", "any", repeated=True),
+        F(2, "memo"),
+        F(3, "timeout_height", "uint64"),
+        F(1023, "extension_options", "any", repeated=True),
+        F(2047, "non_critical_extension_options", "any", repeated=True),
+    ],
+)
+register_message(
+    "cosmos.tx.v1beta1.AuthInfo",
+    [
+        F(1, "signer_infos", "message", "cosmos.tx.v1beta1.SignerInfo", repeated=True),
+        F(2, "fee", "message", "cosmos.tx.v1beta1.Fee"),
+        F(3, "tip", "message", "cosmos.tx.v1beta1.Tip"),
+    ],
+)
+register_message(
+    "cosmos.tx.v1beta1.SignerInfo",
+    [F(1, "public_key", "any"), F(2, "mode_info", "message", "cosmos.tx.v1beta1.ModeInfo"), F(3, "sequence", "uint64")],
+)
+register_message(
+    "cosmos.tx.v1beta1.ModeInfo",
+    [F(1, "single", "message", "cosmos.tx.v1beta1.ModeInfo.Single", oneof=True), F(2, "multi", "message", "cosmos.tx.v1beta1.ModeInfo.Multi", oneof=True)],
+)
+register_message("cosmos.tx.v1beta1.ModeInfo.Single", [F(1, "mode", "enum", "cosmos.tx.signing.v1beta1.SignMode")])
+register_message(
+    "cosmos.tx.v1beta1.ModeInfo.Multi",
+    [F(1, "bitarray", "message", "cosmos.crypto.multisig.v1beta1.CompactBitArray"), F(2, "mode_infos", "message", "cosmos.tx.v1beta1.ModeInfo", repeated=True)],
+)
+register_message("cosmos.crypto.multisig.v1beta1.CompactBitArray", [F(1, "extra_bits_stored", "uint32"), F(2, "elems", "bytes")])
+register_message(
+    "cosmos.tx.v1beta1.Fee",
+    [F(1, "amount", "message", COIN, repeated=True), F(2, "gas_limit", "uint64"), F(3, "payer"), F(4, "granter")],
+)
+register_message("cosmos.tx.v1beta1.Tip", [F(1, "amount", "message", COIN, repeated=True), F(2, "tipper")])
+register_message(COIN, [F(1, "denom"), F(2, "amount", "int")])
+
+# public keys
+for _pubkey in ("cosmos.crypto.secp256k1.PubKey", "cosmos.crypto.ed25519.PubKey", "cosmos.crypto.secp256r1.PubKey"):
+    register_message(_pubkey, [F(1, "key", "bytes")])
+register_message("cosmos.crypto.multisig.LegacyAminoPubKey", [F(1, "threshold", "uint32"), F(2, "public_keys", "any", repeated=True)])
+
+# bank
+register_message("cosmos.bank.v1beta1.MsgSend", [F(1, "from_address"), F(2, "to_address"), F(3, "amount", "message", COIN, repeated=True)])
+register_message("cosmos.bank.v1beta1.Input", [F(1, "address"), F(2, "coins", "message", COIN, repeated=True)])
+register_message("cosmos.bank.v1beta1.Output", [F(1, "address"), F(2, "coins", "message", COIN, repeated=True)])
+register_message(
+    "cosmos.bank.v1beta1.MsgMultiSend",
+    [F(1, "inputs", "message", "cosmos.bank.v1beta1.Input", repeated=True), F(2, "outputs", "message", "cosmos.bank.v1beta1.Output", repeated=True)],
+)
+
+# staking
+for _msg in ("MsgDelegate", "MsgUndelegate"):
+    register_message(f"cosmos.staking.v1beta1.{_msg}", [F(1, "delegator_address"), F(2, "validator_address"), F(3, "amount", "message", COIN, nullable=False)])
+register_message(
+    "cosmos.staking.v1beta1.MsgBeginRedelegate",
+    [F(1, "delegator_address"), F(2, "validator_src_address"), F(3, "validator_dst_address"), F(4, "amount", "message", COIN, nullable=False)],
+)
+register_message(
+    "cosmos.staking.v1beta1.MsgCancelUnbondingDelegation",
+    [F(1, "delegator_address"), F(2, "validator_address"), F(3, "amount", "message", COIN, nullable=False), F(4, "creation_height", "int64")],
+)
+
+# distribution
+register_message("cosmos.distribution.v1beta1.MsgWithdrawDelegatorReward", [F(1, "delegator_address"), F(2, "validator_address")])
+register_message("cosmos.distribution.v1beta1.MsgWithdrawValidatorCommission", [F(1, "validator_address")])
+register_message("cosmos.distribution.v1beta1.MsgSetWithdrawAddress", [F(1, "delegator_address"), F(2, "withdraw_address")])
+register_message("cosmos.distribution.v1beta1.MsgFundCommunityPool", [F(1, "amount", "message", COIN, repeated=True), F(2, "depositor")])
+
+# gov
+register_message("cosmos.gov.v1beta1.MsgVote", [F(1, "proposal_id", "uint64"), F(2, "voter"), F(3, "option", "enum", "cosmos.gov.VoteOption")])
+register_message("cosmos.gov.v1.MsgVote", [F(1, "proposal_id", "uint64"), F(2, "voter"), F(3, "option", "enum", "cosmos.gov.VoteOption"), F(4, "metadata")])
+for _gov in ("v1beta1", "v1"):
+    register_message(f"cosmos.gov.{_gov}.MsgDeposit", [F(1, "proposal_id", "uint64"), F(2, "depositor"), F(3, "amount", "message", COIN, repeated=True)])
+
+# authz
+register_message("cosmos.authz.v1beta1.MsgExec", [F(1, "grantee"), F(2, "msgs", "any", repeated=True)])
+register_message("cosmos.authz.v1beta1.MsgRevoke", [F(1, "granter"), F(2, "grantee"), F(3, "msg_type_url")])
+register_message("cosmos.authz.v1beta1.Grant", [F(1, "authorization", "any"), F(2, "expiration", "timestamp")])
+register_message("cosmos.authz.v1beta1.MsgGrant", [F(1, "granter"), F(2, "grantee"), F(3, "grant", "message", "cosmos.authz.v1beta1.Grant", nullable=False)])
+register_message("cosmos.authz.v1beta1.GenericAuthorization", [F(1, "msg")])
+register_message("cosmos.bank.v1beta1.SendAuthorization", [F(1, "spend_limit", "message", COIN, repeated=True), F(2, "allow_list", repeated=True)])
+
+# slashing
+register_message("cosmos.slashing.v1beta1.MsgUnjail", [F(1, "validator_addr")])
+
+# cosmwasm
+register_message(
+    "cosmwasm.wasm.v1.MsgExecuteContract",
+    [F(1, "sender"), F(2, "contract"), F(3, "msg", "rawjson"), F(5, "funds", "message", COIN, repeated=True)],
+)
+register_message(
+    "cosmwasm.wasm.v1.MsgInstantiateContract",
+    [F(1, "sender"), F(2, "admin"), F(3, "code_id", "uint64"), F(4, "label"), F(5, "msg", "rawjson"), F(6, "funds", "message", COIN, repeated=True)],
+)
+register_message(
+    "cosmwasm.wasm.v1.MsgInstantiateContract2",
+    [
+        F(1, "sender"),
+        F(2, "admin"),
+        F(3, "code_id", "uint64"),
+        F(4, "label"),
+        F(5, "msg", "rawjson"),
+        F(6, "funds", "message", COIN, repeated=True),
+        F(7, "salt", "bytes"),
+        F(8, "fix_msg", "bool"),
+    ],
+)
+register_message("cosmwasm.wasm.v1.MsgMigrateContract", [F(1, "sender"), F(2, "contract"), F(3, "code_id", "uint64"), F(4, "msg", "rawjson")])
+register_message("cosmwasm.wasm.v1.MsgUpdateAdmin", [F(1, "sender"), F(2, "new_admin"), F(3, "contract")])
+register_message("cosmwasm.wasm.v1.MsgClearAdmin", [F(1, "sender"), F(3, "contract")])
+
+# ibc transfer
+register_message("ibc.core.client.v1.Height", [F(1, "revision_number", "uint64"), F(2, "revision_height", "uint64")])
+register_message(
+    "ibc.applications.transfer.v1.MsgTransfer",
+    [
+        F(1, "source_port"),
+        F(2, "source_channel"),
+        F(3, "token", "message", COIN, nullable=False),
+        F(4, "sender"),
+        F(5, "receiver"),
+        F(6, "timeout_height", "message", "ibc.core.client.v1.Height", nullable=False),
+        F(7, "timeout_timestamp", "uint64"),
+        F(8, "memo"),
+    ],
+)
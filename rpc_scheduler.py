@@ -0,0 +1,164 @@
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
+
+LATENCY_WINDOW = 200
+ERROR_WINDOW = 50
+
+# CometBFT: "height 5 is not available, lowest height is 1000"
+LOWEST_HEIGHT_RE = re.compile(r"lowest height is (\d+)")
+
+
+@dataclass
+class Endpoint:
+    url: str
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    results: deque = field(default_factory=lambda: deque(maxlen=ERROR_WINDOW))
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    earliest_height: int = 0  # lowest height this node can serve (archive depth)
+    latest_height: int = 0
+    supports_batch: bool = True  # JSON-RPC batch POSTs
+    semaphore: asyncio.Semaphore = field(default_factory=asyncio.Semaphore, repr=False)  # in flight requests
+
+    def latency_percentile(self, percentile: float) -> float:
+        if len(self.latencies) == 0:
+            return 0.0
+        values = sorted(self.latencies)
+        index = min(int(len(values) * percentile / 100), len(values) - 1)
+        return values[index]
+
+    def error_rate(self) -> float:
+        if len(self.results) == 0:
+            return 0.0
+        return self.results.count(False) / len(self.results)
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def can_serve(self, height: int | None, check_tip: bool = True) -> bool:
+        if height is None:
+            return True
+        if self.earliest_height > 0 and height < self.earliest_height:
+            return False
+        # a lagging node does not have the block yet
+        return not (check_tip and self.latest_height > 0 and height > self.latest_height)
+
+    def weight(self) -> float:
+        p50 = self.latency_percentile(50)
+        if p50 <= 0:
+            # never measured, give it a chance to prove itself
+            p50 = 0.05
+        health = (1.0 - self.error_rate()) ** 2
+        return max(health / p50, 0.001)
+
+
+class EndpointScheduler:
+    """
+    Picks an RPC endpoint per request, weighted by latency & error rate.
+    Nodes which fail `failure_threshold` times in a row are ejected for
+    `eject_seconds` (circuit breaker), then get a single half-open retry.
+    Each node allows at most `max_concurrency` requests in flight.
+    """
+
+    def __init__(self, urls: list[str], failure_threshold: int = 5, eject_seconds: float = 30, max_concurrency: int = 16):
+        self.endpoints = [Endpoint(url.rstrip("/"), semaphore=asyncio.Semaphore(max_concurrency)) for url in urls]
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+
+    def pick(self, height: int | None = None, exclude: set[str] | None = None) -> Endpoint | None:
+        now = time.time()
+        exclude = exclude or set()
+        servable = [e for e in self.endpoints if e.can_serve(height)]
+        if len(servable) == 0:
+            # above every tip seen by the last refresh_status: the chain moved on since, any node
+            # with the archive depth may have it by now
+            servable = [e for e in self.endpoints if e.can_serve(height, check_tip=False)]
+        if len(servable) == 0:
+            return None
+
+        candidates = [e for e in servable if not e.is_ejected(now) and e.url not in exclude]
+        if len(candidates) == 0:
+            candidates = [e for e in servable if not e.is_ejected(now)]
+        if len(candidates) == 0:
+            # everything is ejected, probe the one which comes back first
+            return min(servable, key=lambda e: e.ejected_until)
+
+        return random.choices(candidates, weights=[e.weight() for e in candidates])[0]
+
+    def record_success(self, endpoint: Endpoint, latency: float):
+        endpoint.latencies.append(latency)
+        endpoint.results.append(True)
+        endpoint.consecutive_failures = 0
+        endpoint.ejected_until = 0.0
+
+    def record_failure(self, endpoint: Endpoint, error_text: str = ""):
+        match = LOWEST_HEIGHT_RE.search(error_text)
+        if match is not None:
+            # not unhealthy, just pruned below this height
+            endpoint.earliest_height = max(endpoint.earliest_height, int(match.group(1)))
+            return
+
+        endpoint.results.append(False)
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.failure_threshold:
+            endpoint.ejected_until = time.time() + self.eject_seconds
+            print(f"Ejecting RPC {endpoint.url} for {self.eject_seconds}s after {endpoint.consecutive_failures} failures")
+
+    async def refresh_status(self, client: httpx.AsyncClient) -> int:
+        """
+        Updates archive depth & tip of every endpoint from /status.
+        Returns the highest chain height any endpoint reports, -1 if none answered.
+        """
+
+        async def _status(endpoint: Endpoint):
+            start = time.time()
+            try:
+                async with endpoint.semaphore:
+                    r = await client.get(f"{endpoint.url}/status", timeout=10)
+            except httpx.HTTPError as e:
+                self.record_failure(endpoint)
+                print(f"Error: refresh_status {e!r} @ {endpoint.url}")
+                return
+
+            if r.status_code != 200:
+                self.record_failure(endpoint, r.text)
+                print(f"Error: refresh_status status_code: {r.status_code} @ {endpoint.url}")
+                return
+
+            try:
+                sync_info = r.json().get("result", {}).get("sync_info", {})
+                earliest_height = int(sync_info.get("earliest_block_height", "0"))
+                latest_height = int(sync_info.get("latest_block_height", "0"))
+            except (ValueError, TypeError, AttributeError) as e:
+                # a 200 html / error page or a malformed height
+                self.record_failure(endpoint)
+                print(f"Error: refresh_status invalid /status body {e!r} @ {endpoint.url}")
+                return
+
+            self.record_success(endpoint, time.time() - start)
+            endpoint.earliest_height = earliest_height
+            endpoint.latest_height = latest_height
+
+        await asyncio.gather(*[_status(e) for e in self.endpoints])
+
+        heights = [e.latest_height for e in self.endpoints if e.latest_height > 0]
+        if len(heights) == 0:
+            return -1
+        return max(heights)
+
+    def summary(self) -> str:
+        now = time.time()
+        lines = []
+        for e in self.endpoints:
+            state = "ejected" if e.is_ejected(now) else "ok"
+            lines.append(
+                f"{e.url}: {state} p50={e.latency_percentile(50):.3f}s p95={e.latency_percentile(95):.3f}s "
+                f"errors={e.error_rate():.0%} heights={e.earliest_height:,}->{e.latest_height:,}"
+            )
+        return "\n".join(lines)
@@ -32,8 +32,7 @@ START_BLOCK = 1
 END_BLOCK = latest_block.height
 
 print(f"Getting all transactions in range of blocks: {START_BLOCK} to {END_BLOCK}")
-all_txs = db.get_txs_in_range(START_BLOCK, END_BLOCK)
-print(f"Total Txs found: {len(all_txs):,}")
+all_txs = db.get_txs_in_range(START_BLOCK, END_BLOCK, columns=["id", "height", "msg_types", "tx_json"])
 
 async def get_label(client: httpx.AsyncClient, contract_addr: str) -> Contract:
     for i in range(2):
@@ -49,8 +48,10 @@ async def get_label(client: httpx.AsyncClient, contract_addr: str) -> Contract:
 
 print("Getting all MsgExecuteContract's")
 contracts = {}
+total_txs = 0
 for tx in all_txs:
-    if "MsgExecuteContract" not in tx.msg_types:
+    total_txs += 1
+    if not tx.msg_types or "MsgExecuteContract" not in tx.msg_types:
         continue
 
     _json = json.loads(tx.tx_json)
@@ -61,6 +62,7 @@ for tx in all_txs:
                 contracts[c_addr] = 0
             contracts[c_addr] += 1
 
+print(f"Total Txs found: {total_txs:,}")
 contracts = {k: v for k, v in contracts.items() if v >= INTERACTION_CUTOFF}
 print(f"Total contracts (after removing <{INTERACTION_CUTOFF} interactions): {len(contracts):,}")
 
@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 
@@ -38,34 +37,17 @@ if last_tx_saved is None:
     exit(1)
 
 GAS_AMOUNT = 0
-total_ujuno_fees = 0
-total_txs = 0
+MSG_TYPE = "/cosmwasm.wasm.v1.MsgExecuteContract"
 
 # Gets last XXmil txs
-for i in range(last_tx_saved.id - 10_000_000, last_tx_saved.id):
-    tx = db.get_tx_specific(i, fields=["id", "height", "tx_json"])
-    if tx is None:
-        continue
-
-    if i % 100_000 == 0:
-        print(f"Tx {i:,}")
-
-    if len(tx.tx_json) == 0:
-        continue
-
-    height = tx.height
-    tx_json = json.loads(tx.tx_json)
-    fees = tx_json["auth_info"]["fee"]["amount"]
-
-    if "cosmwasm.wasm.v1.MsgExecuteContract" not in tx.tx_json:
-        continue
-
-    total_txs += 1
-
-    for coin in fees:
-        if coin['denom'] == 'ujuno':
-            amt = int(coin['amount'])
-            total_ujuno_fees += amt
+first_tx = db.get_first_tx_from_id(max(last_tx_saved.id - 10_000_000, 1))
+start_height = first_tx.height if first_tx is not None else earliest_block.height
+end_height = latest_block.height
+
+# one server side aggregate over the whole range (bucket = range), indexed in TX_JSON_STORAGE jsonb mode
+bucket_size = end_height + 1
+total_ujuno_fees = sum(v.get("ujuno", 0) for v in db.get_fee_totals(start_height, end_height, bucket_size, msg_type=MSG_TYPE, denom="ujuno").values())
+total_txs = sum(db.get_decoded_tx_counts(start_height, end_height, bucket_size, msg_type=MSG_TYPE).values())
 
 print(f"{GAS_AMOUNT=:,} spent over {total_txs=:,} txs")
 avg = int(GAS_AMOUNT / total_txs)
@@ -13,19 +13,12 @@ If they did
 
 import json
 import os
-import sys
 
-current_dir = os.path.dirname(os.path.realpath(__file__))
-parent = os.path.dirname(current_dir)
-sys.path.append(parent)
-
-from SQL import Database
+from base_script import DBInformation as scheme
 
 # 5779678 -> 7990650
-db = Database(os.path.join(current_dir, os.path.join(parent, "data.db")))
-if db is None:
-    print("No db found")
-    exit(1)
+current_dir = scheme.current_dir
+db = scheme.database
 
 
 with open(os.path.join(current_dir, "all_validators.json"), "r") as f:
@@ -50,7 +43,7 @@ IGNORE_PROPOSAL_IDS = [
     "94",  # spam
 ]
 
-all_txs = db.get_txs_in_range(START_BLOCK, END_BLOCK)
+all_txs = db.get_txs_in_range(START_BLOCK, END_BLOCK, columns=["id", "height", "msg_types", "tx_json"])
 
 
 all_proposals_during_time = set()
@@ -60,7 +53,7 @@ validator_voters: dict[str, list[int]] = {}
 
 
 for tx in all_txs:
-    if len(tx.msg_types) == 0:
+    if not tx.msg_types:
         continue
 
     # [{'@type': '/cosmos.gov.v1beta1.MsgVote', 'proposal_id': '57', 'voter': 'juno1k0hmfxjj3thuc47057cxuhxneu8rmseudyg9dd', 'option': 'VOTE_OPTION_YES'}]
@@ -5,41 +5,29 @@ with the total number of messages done.
 
 import json
 import os
-import sys
 
-current_dir = os.path.dirname(os.path.realpath(__file__))
-parent = os.path.dirname(current_dir)
-sys.path.append(parent)
+from base_script import DBInformation as scheme
 
-from SQL import Database
-
-db = Database(os.path.join(current_dir, os.path.join(parent, "data.db")))
-
-latest_block = db.get_latest_saved_block()
-if latest_block is None:
-    print("No blocks found in db")
-    exit(1)
+current_dir = scheme.current_dir
+db = scheme.database
+latest_block = scheme.latest_block
 
 
 START_BLOCK = 1
 # START_BLOCK = latest_block.height - 100_000  # ump all_interactions to file
 END_BLOCK = latest_block.height
 
-print(f"Getting all transactions in range of blocks: {START_BLOCK} to {END_BLOCK}")
-all_txs = db.get_txs_in_range(START_BLOCK, END_BLOCK)
-print(f"Total Txs found: {len(all_txs):,}")
+print(f"Getting all messages in range of blocks: {START_BLOCK} to {END_BLOCK}")
 
-# msg_type: amount
+# msg_type: amount (top level messages, as they are signed)
 all_interactions: dict[str, int] = {}
-for tx in all_txs:
-    if len(tx.msg_types) == 0:
+for msg in db.get_messages(START_BLOCK, END_BLOCK):
+    if msg.parent_index is not None:
         continue
 
-    _json = json.loads(tx.tx_json)
-    for msg in _json["body"]["messages"]:
-        if msg["@type"] not in all_interactions:
-            all_interactions[msg["@type"]] = 0
-        all_interactions[msg["@type"]] += 1
+    if msg.msg_type not in all_interactions:
+        all_interactions[msg.msg_type] = 0
+    all_interactions[msg.msg_type] += 1
 
 all_interactions = dict(
     sorted(all_interactions.items(), key=lambda item: item[1], reverse=True)
@@ -17,40 +17,14 @@ Config: (download, then decode with TX_AMINO_LENGTH_CUTTOFF_LIMIT set to 0 on do
 # Data: https://gist.github.com/Reecepbcups/80c84ce39ad00d8cb011a08a7a20bd1b
 
 import json
-import os
-import sys
 from base64 import b64decode
 
-current_dir = os.path.dirname(os.path.realpath(__file__))
-parent = os.path.dirname(current_dir)
-sys.path.append(parent)
-
-from SQL import Database
+from base_script import DBInformation as scheme
 
 # 5779678 -> 7990650
-db = Database(os.path.join(current_dir, os.path.join(parent, "data_relayer.db")))
-if db is None:
-    print("No db found")
-    exit(1)
-
-earliest_block = db.get_earliest_block()
-if earliest_block is None:
-    print("No blocks found in db")
-    exit(1)
-
-latest_block = db.get_latest_saved_block()
-if latest_block is None:
-    print("No blocks found in db")
-    exit(1)
-
-
-# last_tx_saved = db.get_last_saved_tx().id
-last_tx_saved = db.get_last_saved_tx()
-if last_tx_saved is None:
-    print("No txs found in db")
-    exit(1)
-print(f"{last_tx_saved.id=}")
-# exit(1)
+db = scheme.database
+earliest_block = scheme.earliest_block
+latest_block = scheme.latest_block
 
 ibc_txs = {
     # '/ibc.applications.transfer.v1.MsgTransfer'
@@ -97,50 +71,34 @@ def get_ibc_packet_data(msg: dict) -> dict:
     return data
 
 
-# last_tx_saved.id
-for i in range(1, last_tx_saved.id):
-    if i % 10_000 == 0:
-        print(f"Tx {i}")
+# We are not going to check for timeout packets
+for m in db.get_messages(earliest_block.height, latest_block.height, msg_types=list(ibc_txs)):
+    msg: dict = m.payload
 
-    tx = db.get_tx(i)
-    if tx is None:
+    signer = ""
+    if "signer" not in msg:
         continue
+    signer = msg["signer"]
 
-    tx_json = json.loads(tx.tx_json)
-
-    msg: dict
-    for msg in list(tx_json["body"]["messages"]):
-        # msg_type = msg["@type"]
-
-        # We are not going to check for timeout packets
-        if msg["@type"] != "/ibc.core.channel.v1.MsgAcknowledgement":
-            continue
+    all_ibc_txs += 1
 
-        signer = ""
-        if "signer" not in msg:
-            continue
-        signer = msg["signer"]
+    source_channel = msg["packet"]["source_channel"]
+    destination_channel = msg["packet"]["destination_channel"]
 
-        all_ibc_txs += 1
-
-        source_channel = msg["packet"]["source_channel"]
-        destination_channel = msg["packet"]["destination_channel"]
-
-        if source_channel not in channels.values():
-            continue
+    if source_channel not in channels.values():
+        continue
 
-        # We only add for the channels we relay
-        specific_ibc_tx_counter += 1
+    # We only add for the channels we relay
+    specific_ibc_tx_counter += 1
 
-        # print(f"{source_channel=}, {destination_channel=}")
-        # print(msg)
-        # print(tx.tx_hash)
-        # exit(1)
+    # print(f"{source_channel=}, {destination_channel=}")
+    # print(msg)
+    # exit(1)
 
-        if signer not in relayed_packets:
-            relayed_packets[signer] = 1
-        else:
-            relayed_packets[signer] += 1
+    if signer not in relayed_packets:
+        relayed_packets[signer] = 1
+    else:
+        relayed_packets[signer] += 1
 
 
 print("=======")
@@ -7,18 +7,11 @@ Final Calulation: https://gist.github.com/Reecepbcups/a300c9973bec1de595eb371f9d
 """
 import json
 import os
-import sys
 
-current_dir = os.path.dirname(os.path.realpath(__file__))
-parent = os.path.dirname(current_dir)
-sys.path.append(parent)
+from base_script import DBInformation as scheme
 
-from SQL import Database
-
-db = Database(os.path.join(current_dir, os.path.join(parent, "data.db")))
-if db is None:
-    print("No db found")
-    exit(1)
+current_dir = scheme.current_dir
+db = scheme.database
 
 # earliest_block = db.get_earliest_block()
 earliest_block = db.get_block(8540001) # ensure this has a single tx at minimum, else increase +1 until.
@@ -32,82 +25,19 @@ if latest_block is None:
     print("No blocks found in db")
     exit(1)
 
-earliest_tx_id = 18_000_000
-# last_tx_saved_id = db.get_tx(latest_block.tx_ids[0]).id
-last_tx_saved_id = 20_784_379
-
-# last_saved_tx_id = last_tx_saved.id
-# if last_tx_saved is None:
-#     print("No txs found in db")
-#     exit(1)
-# print(f"{last_saved_tx_id=}")
-
-
 seconds_in_a_day = 86_400
 # blocks_in_a_week = (seconds_in_a_day * 7) / 6
-blocks_in_a_week = (seconds_in_a_day) / 6
-
-
-# weekend_height_key: [{"ujuno": 10000}]
-total_fees_paid: dict[int, dict[str, float]] = {}
-total_ujuno_fees_paid_lifetime = 0
-
-# height key : amount
-total_txs_per_week: dict[int, int] = {}
-
-# height where its based off the week, 30m is arbitrary
-total_fees_paid = {k: {} for k in range(1, 30_000_000, int(blocks_in_a_week))}
-
-
-def find_closest_key(target_key):
-    closest_key = min(total_fees_paid.keys(), key=lambda x: abs(x - target_key))
-    return closest_key
-
-
-for i in range(earliest_tx_id, last_tx_saved_id):
-    tx = db.get_tx_specific(i, fields=["id", "height", "tx_json"])
-    if tx is None:
-        continue
-
-    if len(tx.tx_json) == 0:
-        # print(f"Tx {i:,} has no tx_json (not decoded)")
-        continue
-
-    height = tx.height
-    tx_json = json.loads(tx.tx_json)
-    fees = tx_json["auth_info"]["fee"]["amount"]
-
-    if tx.id % 50_000 == 0:
-        # print(f"Tx {i:,}")
-        print(f"TxId:{tx.id:,}")
-
-    # get the closes key value from total_fees_paid to height
-    closest_key = find_closest_key(height)
-
-    if closest_key not in total_fees_paid:
-        total_fees_paid[closest_key] = {}
-
-    if closest_key not in total_txs_per_week:
-        total_txs_per_week[closest_key] = 0
-
-    total_txs_per_week[closest_key] += 1
-
-    for fee in fees:
-        denom = fee["denom"]
-        amount = int(fee["amount"])
-
-        if amount == 0:
-            continue
-
-        if denom == "ujuno":
-            total_ujuno_fees_paid_lifetime += amount
-
-        if denom not in total_fees_paid[closest_key]:
-            total_fees_paid[closest_key][denom] = 0
-
-        total_fees_paid[closest_key][denom] += amount
+blocks_in_a_week = int((seconds_in_a_day) / 6)
 
+# summed server side (indexed in TX_JSON_STORAGE jsonb mode), only the totals leave the db
+# bucket_start_height: {"ujuno": 10000}
+total_fees_paid = db.get_fee_totals(earliest_block.height, latest_block.height, blocks_in_a_week)
+total_fees_paid = {k: {denom: amount for denom, amount in v.items() if amount != 0} for k, v in sorted(total_fees_paid.items())}
 total_fees_paid = {k: v for k, v in total_fees_paid.items() if v != {}}
+total_ujuno_fees_paid_lifetime = sum(v.get("ujuno", 0) for v in total_fees_paid.values())
+
+# bucket_start_height : amount
+total_txs_per_week = db.get_decoded_tx_counts(earliest_block.height, latest_block.height, blocks_in_a_week)
 # sort keys total_txs_per_week
 total_txs_per_week = dict(sorted(total_txs_per_week.items()))
 with open(os.path.join(current_dir, "all_fees_over_time.json"), "w") as f:
@@ -1,42 +1,16 @@
 """
 Gets validator unjails for soft or hard slashing.
 """
-import json
-import os
-import sys
+from base_script import DBInformation as scheme
 
-current_dir = os.path.dirname(os.path.realpath(__file__))
-parent = os.path.dirname(current_dir)
-sys.path.append(parent)
+db = scheme.database
 
-from SQL import Database
-
-db = Database(os.path.join(current_dir, os.path.join(parent, "data.db")))
-
-latest_block = db.get_latest_saved_block()
-if latest_block is None:
-    print("No blocks found in db")
-    exit(1)
-
-# unique_msgs = {}
 unjails = []
-for i in range(1, 1_000_000):
-    tx = db.get_tx(i)
-    if tx is None:
-        continue
-
-    if "slashing." not in tx.msg_types:
-        continue
-
-    tx_json = json.loads(tx.tx_json)
-    for msg in tx_json["body"]["messages"]:
-        if msg["@type"] != "/cosmos.slashing.v1beta1.MsgUnjail":
-            continue
-
-        val_addr = msg["validator_addr"]
-        block = tx.height
-        print(f"{val_addr} was unjailed at block {block}")
-        unjails.append((val_addr, block))
+for msg in db.get_messages(scheme.earliest_block.height, scheme.latest_block.height, msg_types=["/cosmos.slashing.v1beta1.MsgUnjail"]):
+    val_addr = msg.payload["validator_addr"]
+    block = msg.height
+    print(f"{val_addr} was unjailed at block {block}")
+    unjails.append((val_addr, block))
 
 print(len(unjails))
 
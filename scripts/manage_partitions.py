@@ -0,0 +1,51 @@
+"""
+Lists, detaches or attaches the height range partitions of blocks & txs. Attached partitions
+get the size of the existing ones, or PARTITION_SIZE in chain_config.json if there are none.
+
+    python manage_partitions.py list
+    python manage_partitions.py detach <first height of the partition>
+    python manage_partitions.py attach <first height of the partition>
+
+A detached partition stays as blocks_p<height> / txs_p<height>, so it can be dumped with
+pg_dump -t, moved to another tablespace or dropped, then attached again later.
+"""
+
+import json
+import os
+import sys
+
+from base_script import DBInformation as scheme
+
+with open(os.path.join(scheme.parent, "chain_config.json"), "r") as f:
+    chain_config = dict(json.load(f))
+
+PARTITION_SIZE = chain_config.get("PARTITION_SIZE", 0)
+
+db = scheme.database
+
+if len(sys.argv) < 2 or sys.argv[1] not in ("list", "detach", "attach"):
+    print(__doc__)
+    exit(1)
+
+action = sys.argv[1]
+if action == "list":
+    for name, bounds in db.get_partitions():
+        print(f"{name}: {bounds}")
+    exit(0)
+
+if len(sys.argv) < 3:
+    print(__doc__)
+    exit(1)
+
+start = int(sys.argv[2])
+if action == "detach":
+    db.detach_partition(start)
+    print(f"Detached blocks_p{start} & txs_p{start}")
+else:
+    try:
+        partition_size = db.get_partition_size(PARTITION_SIZE)
+    except ValueError as e:
+        print(e)
+        exit(1)
+    db.attach_partition(start, partition_size)
+    print(f"Attached blocks_p{start} & txs_p{start} for heights {start:,}->{start + partition_size - 1:,}")
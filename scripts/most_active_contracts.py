@@ -6,20 +6,12 @@ The Queries contracts to get their label for a human readable format.
 import asyncio
 import json
 import os
-import sys
 
-current_dir = os.path.dirname(os.path.realpath(__file__))
-parent = os.path.dirname(current_dir)
-sys.path.append(parent)
+from base_script import DBInformation as scheme
 
-from SQL import Database
-
-db = Database(os.path.join(current_dir, os.path.join(parent, "data.db")))
-
-latest_block = db.get_latest_saved_block()
-if latest_block is None:
-    print("No blocks found in db")
-    exit(1)
+current_dir = scheme.current_dir
+db = scheme.database
+latest_block = scheme.latest_block
 
 # get all transactions in the last 11 days, height 7755721 to 7919651 (April 20th)
 # START_BLOCK = latest_block.height - 1_000_000
@@ -27,26 +19,14 @@ START_BLOCK = 1
 END_BLOCK = latest_block.height
 INTERACTION_CUTOFF = 100
 
-print(f"Getting all transactions in range of blocks: {START_BLOCK} to {END_BLOCK}")
-all_txs = db.get_txs_in_range(START_BLOCK, END_BLOCK)
-print(f"Total Txs found: {len(all_txs):,}")
+print(f"Getting all contract executes in range of blocks: {START_BLOCK} to {END_BLOCK}")
 
-# contract_addr: amount
+# contract_addr: amount (authz executes included)
 contracts: dict[str, int] = {}
-for tx in all_txs:
-    if len(tx.msg_types) == 0:
-        continue
-
-    if "MsgExecuteContract" not in tx.msg_types:
-        continue
-
-    _json = json.loads(tx.tx_json)
-    for msg in _json["body"]["messages"]:
-        # Add AUTHZ support?
-        if msg["@type"] == "/cosmwasm.wasm.v1.MsgExecuteContract":
-            if msg["contract"] not in contracts:
-                contracts[msg["contract"]] = 0
-            contracts[msg["contract"]] += 1
+for msg in db.get_messages(START_BLOCK, END_BLOCK, msg_types=["/cosmwasm.wasm.v1.MsgExecuteContract"]):
+    if msg.contract not in contracts:
+        contracts[msg.contract] = 0
+    contracts[msg.contract] += 1
 
 
 updated_contracts = {k: v for k, v in contracts.items() if v >= INTERACTION_CUTOFF}
@@ -0,0 +1,206 @@
+"""
+Runs N `main.py <section> --worker` processes over a single block range.
+
+The range is handed out in chunks which shrink as the range drains (guided scheduling),
+so a worker which finishes early keeps pulling work instead of idling while others
+finish a large hand-made shard. Crashed workers are restarted and their chunk requeued.
+
+usage: python supervisor.py <section> <workers> [start] [end]
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+current_dir = os.path.dirname(os.path.realpath(__file__))
+
+with open(os.path.join(current_dir, "chain_config.json"), "r") as f:
+    chain_config = dict(json.load(f))
+
+# must match main.py
+WORKER_CHUNK_DONE = "@@chunk_done"
+
+MIN_CHUNK_SIZE = chain_config.get("SUPERVISOR_MIN_CHUNK_SIZE", 1_000)
+MAX_CHUNK_SIZE = chain_config.get("SUPERVISOR_MAX_CHUNK_SIZE", 50_000)
+MAX_RESTARTS = chain_config.get("SUPERVISOR_MAX_RESTARTS", 20)
+PROGRESS_INTERVAL = 30
+
+
+class ChunkQueue:
+    def __init__(self, start: int, end: int, workers: int):
+        self.next_height = start
+        self.end = end
+        self.workers = workers
+        self.requeued: deque[tuple[int, int]] = deque()
+
+    def pop(self) -> tuple[int, int] | None:
+        if self.requeued:
+            return self.requeued.popleft()
+        remaining = self.end - self.next_height + 1
+        if remaining <= 0:
+            return None
+
+        size = min(max(remaining // (self.workers * 4), MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+        chunk = (self.next_height, min(self.next_height + size - 1, self.end))
+        self.next_height = chunk[1] + 1
+        return chunk
+
+    def push_front(self, chunk: tuple[int, int]):
+        self.requeued.appendleft(chunk)
+
+
+class Worker:
+    def __init__(self, worker_id: int, section: str, events: queue.Queue):
+        self.worker_id = worker_id
+        self.section = section
+        self.events = events
+        self.restarts = 0
+        self.chunk: tuple[int, int] | None = None
+        self.proc: subprocess.Popen | None = None
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(current_dir, "main.py"), self.section, "--worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        )
+        threading.Thread(target=self._read_output, args=(self.proc,), daemon=True).start()
+
+    def _read_output(self, proc: subprocess.Popen):
+        for line in proc.stdout:
+            self.events.put((self.worker_id, line.rstrip("\n")))
+        self.events.put((self.worker_id, None))
+
+    def assign(self, chunk: tuple[int, int]):
+        self.chunk = chunk
+        try:
+            self.proc.stdin.write(f"{chunk[0]} {chunk[1]}\n")
+            self.proc.stdin.flush()
+        except BrokenPipeError:
+            # the reader thread sees the exit & the chunk gets requeued
+            pass
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.stdin.close()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Usage: python supervisor.py <section> <workers> [start] [end]. Sections: {', '.join(chain_config.get('sections', {}).keys())}")
+        exit(1)
+
+    section = sys.argv[1]
+    num_workers = int(sys.argv[2])
+    specific_section = chain_config.get("sections", {}).get(section, {})
+    if specific_section == {}:
+        print(f"Chain section {section} not found")
+        exit(1)
+
+    if chain_config.get("TASK", "").lower() != "download":
+        print("The supervisor only runs the download TASK")
+        exit(1)
+
+    start = int(sys.argv[3]) if len(sys.argv) > 3 else specific_section.get("start", -1)
+    end = int(sys.argv[4]) if len(sys.argv) > 4 else specific_section.get("end", -1)
+    if start < 0 or end < start:
+        print("start or end is not set correctly")
+        exit(1)
+
+    total_blocks = end - start + 1
+    chunks = ChunkQueue(start, end, num_workers)
+    events: queue.Queue = queue.Queue()
+    workers = [Worker(i, section, events) for i in range(num_workers)]
+
+    print(f"Supervising {num_workers} workers over {start:,}->{end:,} ({total_blocks:,} blocks)")
+
+    done_blocks = 0
+    saved_blocks = 0
+    start_time = time.time()
+    last_progress = start_time
+
+    def assign_next(worker: Worker):
+        chunk = chunks.pop()
+        if chunk is None:
+            worker.chunk = None
+            worker.stop()
+            return
+        worker.assign(chunk)
+
+    for w in workers:
+        w.start()
+        assign_next(w)
+
+    running = num_workers
+    try:
+        while running > 0:
+            try:
+                worker_id, line = events.get(timeout=PROGRESS_INTERVAL)
+            except queue.Empty:
+                worker_id, line = -1, ""
+
+            if worker_id >= 0:
+                w = workers[worker_id]
+                if line is None:
+                    w.proc.wait()
+                    if w.chunk is None:
+                        running -= 1
+                        continue
+
+                    # crashed mid chunk
+                    print(f"[worker {worker_id}] exited with {w.proc.returncode} during {w.chunk[0]:,}->{w.chunk[1]:,}")
+                    chunks.push_front(w.chunk)
+                    w.chunk = None
+                    w.restarts += 1
+                    if w.restarts > MAX_RESTARTS:
+                        print(f"[worker {worker_id}] restarted too many times, giving up on it")
+                        running -= 1
+                        continue
+
+                    w.start()
+                    assign_next(w)
+
+                elif line.startswith(WORKER_CHUNK_DONE):
+                    _, chunk_start, chunk_end, chunk_saved = line.split()
+                    done_blocks += int(chunk_end) - int(chunk_start) + 1
+                    saved_blocks += int(chunk_saved)
+                    assign_next(w)
+
+                else:
+                    print(f"[worker {worker_id}] {line}")
+
+            if time.time() - last_progress >= PROGRESS_INTERVAL:
+                last_progress = time.time()
+                elapsed = last_progress - start_time
+                rate = saved_blocks / elapsed if elapsed > 0 else 0
+                eta = (total_blocks - done_blocks) / (done_blocks / elapsed) if done_blocks > 0 else 0
+                print(f"Progress: {done_blocks:,}/{total_blocks:,} blocks ({done_blocks / total_blocks:.1%}), saved {saved_blocks:,} @ {rate:,.1f} blocks/s, ETA {eta / 60:,.1f} min")
+
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+        for w in workers:
+            if w.proc is not None and w.proc.poll() is None:
+                w.proc.terminate()
+        exit(1)
+
+    print(f"Finished {done_blocks:,}/{total_blocks:,} blocks (saved {saved_blocks:,}) in {round(time.time() - start_time, 2)} seconds")
+
+    if chain_config.get("BULK_LOAD", False):
+        # the workers dropped the txs indexes, one build once everything is in
+        if done_blocks < total_blocks:
+            print(f"Not building the txs indexes, {total_blocks - done_blocks:,} blocks are not done. Run main.py {section} --build-indexes once they are")
+        else:
+            subprocess.run([sys.executable, os.path.join(current_dir, "main.py"), section, "--build-indexes"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from block_parser import parse_block_batch, parse_block_response
+
+TXS = ["CpABCo0BChwvY29zbW9zLmJhbmsudjFiZXRhMS5Nc2dTZW5k", "AQI="]
+
+
+def block_result(height: int, txs: list[str] | None = TXS) -> dict:
+    return {
+        "block_id": {"hash": "AB", "parts": {"total": 1, "hash": "CD"}},
+        "block": {
+            "header": {"chain_id": "juno-1", "height": str(height), "time": f"2024-05-01T10:00:{height % 60:02d}Z", "last_block_id": {"hash": "EF"}},
+            "data": {"txs": txs},
+            "evidence": {"evidence": []},
+            "last_commit": {"height": str(height - 1), "block_id": {"hash": "EF"}, "signatures": [{"validator_address": "01", "signature": "AQI="}]},
+        },
+    }
+
+
+def response(height: int, **kwargs) -> dict:
+    return {"jsonrpc": "2.0", "id": height, "result": block_result(height, **kwargs)}
+
+
+def test_single_block():
+    for indent in (None, 2):
+        assert parse_block_response(json.dumps(response(10), indent=indent).encode()) == ("2024-05-01T10:00:10Z", TXS)
+    assert parse_block_response(json.dumps(response(10, txs=None)).encode()) == ("2024-05-01T10:00:10Z", [])
+
+
+def test_no_block_is_none():
+    assert parse_block_response(b'{"jsonrpc":"2.0","id":-1,"result":{"block_id":{},"block":null}}') is None
+    assert parse_block_response(b'{"jsonrpc":"2.0","id":-1,"error":{"code":-32603,"message":"height 5 is not available"}}') is None
+    assert parse_block_response(b"<html>502 Bad Gateway</html>") is None
+    assert parse_block_response(b"[]") is None
+
+
+def test_batch():
+    items = [response(11), {"jsonrpc": "2.0", "id": 12, "error": {"code": -32603, "message": "not available"}}, response(13, txs=None)]
+    expected = {11: ("2024-05-01T10:00:11Z", TXS), 13: ("2024-05-01T10:00:13Z", [])}
+    for indent in (None, 2):
+        assert parse_block_batch(json.dumps(items, indent=indent).encode()) == expected
+
+    # ids after the result, null blocks & ids which are not heights go through the full parse
+    swapped = [{"result": block_result(11), "id": 11}, {"result": block_result(13), "id": 13}]
+    assert parse_block_batch(json.dumps(swapped).encode()) == {11: expected[11], 13: ("2024-05-01T10:00:13Z", TXS)}
+    null_block = [response(11), {"jsonrpc": "2.0", "id": 14, "result": {"block": None}}]
+    assert parse_block_batch(json.dumps(null_block).encode()) == {11: expected[11], 14: None}
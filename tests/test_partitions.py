@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+pytest.importorskip("psycopg2")
+
+from SQL import resolve_partition_size
+
+
+def bound(start: int, end: int) -> str:
+    return f"FOR VALUES FROM ({start}) TO ({end})"
+
+
+def test_size_comes_from_the_catalog():
+    bounds = [bound(0, 100_000), bound(100_000, 200_000), "DEFAULT"]
+    assert resolve_partition_size(bounds, 0) == 100_000
+    assert resolve_partition_size(bounds, 100_000) == 100_000
+    # no partition yet, the config decides
+    assert resolve_partition_size([], 50_000) == 50_000
+
+
+def test_mismatches_are_errors():
+    with pytest.raises(ValueError, match="PARTITION_SIZE is 50,000"):
+        resolve_partition_size([bound(0, 100_000)], 50_000)
+    with pytest.raises(ValueError, match="one aligned size"):
+        resolve_partition_size([bound(0, 100_000), bound(100_000, 150_000)], 0)
+    with pytest.raises(ValueError, match="one aligned size"):
+        resolve_partition_size([bound(50, 100_050)], 0)
+    with pytest.raises(ValueError, match="not set"):
+        resolve_partition_size([], 0)
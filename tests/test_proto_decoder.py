@@ -0,0 +1,181 @@
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from decoder import PythonDecoder
+from proto_decoder import F, UnknownTypeError, decode_message, decode_tx, register_message
+
+WALLET = "juno1qyqszqgpqyqszqgpqyqszqgpqyqszqgp9ryl0q"
+OTHER = "juno1zg69v7yszg69v7yszg69v7yszg69v7ys8xdv96"
+
+
+# minimal protobuf writer for the fixtures
+def varint(n: int) -> bytes:
+    out = b""
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out += bytes([b | 0x80])
+        else:
+            return out + bytes([b])
+
+
+def vi(number: int, value: int) -> bytes:
+    return varint(number << 3) + varint(value)
+
+
+def ld(number: int, value: bytes | str) -> bytes:
+    if isinstance(value, str):
+        value = value.encode()
+    return varint(number << 3 | 2) + varint(len(value)) + value
+
+
+def any_(type_url: str, value: bytes) -> bytes:
+    return ld(1, type_url) + ld(2, value)
+
+
+def coin(denom: str, amount: str) -> bytes:
+    return ld(1, denom) + ld(2, amount)
+
+
+def tx_raw(messages: list[bytes], auth_info: bytes = b"", memo: str = "") -> str:
+    body = b"".join(ld(1, m) for m in messages) + (ld(2, memo) if memo else b"")
+    return base64.b64encode(ld(1, body) + ld(2, auth_info) + ld(3, b"\x01\x02")).decode()
+
+
+def dumps(value) -> str:
+    # order sensitive, the binary writes fields in declaration order
+    return json.dumps(value)
+
+
+def test_msg_send_tx():
+    msg = any_("/cosmos.bank.v1beta1.MsgSend", ld(1, WALLET) + ld(2, OTHER) + ld(3, coin("ujuno", "1000")))
+    signer = (
+        ld(1, any_("/cosmos.crypto.secp256k1.PubKey", ld(1, b"\x02\xaa")))
+        + ld(2, ld(1, vi(1, 1)))
+        + vi(3, 5)
+    )
+    fee = ld(1, coin("ujuno", "5000")) + vi(2, 200_000)
+    tx = decode_tx(tx_raw([msg], ld(1, signer) + ld(2, fee), memo="hi"))
+
+    assert dumps(tx) == dumps(
+        {
+            "body": {
+                "messages": [
+                    {
+                        "@type": "/cosmos.bank.v1beta1.MsgSend",
+                        "from_address": WALLET,
+                        "to_address": OTHER,
+                        "amount": [{"denom": "ujuno", "amount": "1000"}],
+                    }
+                ],
+                "memo": "hi",
+                "timeout_height": "0",
+                "extension_options": [],
+                "non_critical_extension_options": [],
+            },
+            "auth_info": {
+                "signer_infos": [
+                    {
+                        "public_key": {"@type": "/cosmos.crypto.secp256k1.PubKey", "key": "Aqo="},
+                        "mode_info": {"single": {"mode": "SIGN_MODE_DIRECT"}},
+                        "sequence": "5",
+                    }
+                ],
+                "fee": {"amount": [{"denom": "ujuno", "amount": "5000"}], "gas_limit": "200000", "payer": "", "granter": ""},
+                "tip": None,
+            },
+            "signatures": ["AQI="],
+        }
+    )
+
+
+def test_nested_any_and_enum():
+    vote = any_("/cosmos.gov.v1beta1.MsgVote", vi(1, 7) + ld(2, WALLET) + vi(3, 3))
+    exec_ = any_("/cosmos.authz.v1beta1.MsgExec", ld(1, OTHER) + ld(2, vote) + ld(2, vote))
+    tx = decode_tx(tx_raw([exec_]))
+
+    expected_vote = {"@type": "/cosmos.gov.v1beta1.MsgVote", "proposal_id": "7", "voter": WALLET, "option": "VOTE_OPTION_NO"}
+    assert dumps(tx["body"]["messages"]) == dumps(
+        [{"@type": "/cosmos.authz.v1beta1.MsgExec", "grantee": OTHER, "msgs": [expected_vote, expected_vote]}]
+    )
+
+
+def test_timestamp_and_non_nullable_defaults():
+    grant = ld(1, any_("/cosmos.authz.v1beta1.GenericAuthorization", ld(1, "/cosmos.bank.v1beta1.MsgSend"))) + ld(2, vi(1, 1_700_000_000) + vi(2, 500_000_000))
+    msg = decode_message("cosmos.authz.v1beta1.MsgGrant", ld(1, WALLET) + ld(2, OTHER) + ld(3, grant))
+    assert dumps(msg) == dumps(
+        {
+            "granter": WALLET,
+            "grantee": OTHER,
+            "grant": {
+                "authorization": {"@type": "/cosmos.authz.v1beta1.GenericAuthorization", "msg": "/cosmos.bank.v1beta1.MsgSend"},
+                "expiration": "2023-11-14T22:13:20.500Z",
+            },
+        }
+    )
+
+    # gogoproto non nullable Coin & math.Int zero value
+    delegate = decode_message("cosmos.staking.v1beta1.MsgDelegate", ld(1, WALLET))
+    assert dumps(delegate) == dumps({"delegator_address": WALLET, "validator_address": "", "amount": {"denom": "", "amount": "0"}})
+
+
+def test_packed_and_unpacked_repeated_fields():
+    register_message("test.v1.Numbers", [F(1, "values", "uint64", repeated=True), F(2, "flags", "bool", repeated=True)])
+    packed = ld(1, varint(1) + varint(300) + varint(2**40)) + ld(2, varint(1) + varint(0))
+    unpacked = vi(1, 1) + vi(1, 300) + vi(1, 2**40) + vi(2, 1) + vi(2, 0)
+
+    expected = dumps({"values": ["1", "300", str(2**40)], "flags": [True, False]})
+    assert dumps(decode_message("test.v1.Numbers", packed)) == expected
+    assert dumps(decode_message("test.v1.Numbers", unpacked)) == expected
+
+
+def test_schema_mismatches_are_unknown():
+    with pytest.raises(UnknownTypeError):
+        decode_tx(tx_raw([any_("/foo.v1.MsgUnknown", b"")]))
+    # a field this table does not have
+    with pytest.raises(UnknownTypeError):
+        decode_message("cosmos.bank.v1beta1.MsgSend", ld(9, "x"))
+    # string sent as a varint, uint64 as length delimited
+    with pytest.raises(UnknownTypeError):
+        decode_message("cosmos.bank.v1beta1.MsgSend", vi(1, 5))
+    with pytest.raises(UnknownTypeError):
+        decode_message("cosmos.gov.v1beta1.MsgVote", ld(1, "7"))
+
+
+class RecordingDecoder:
+    def __init__(self):
+        self.seen = []
+
+    def decode(self, to_decode: list[dict]) -> list[dict]:
+        self.seen.extend(item["id"] for item in to_decode)
+        return [{"id": item["id"], "tx": "{}"} for item in to_decode]
+
+    def close(self):
+        pass
+
+
+def test_python_decoder_falls_back_per_tx():
+    good = tx_raw([any_("/cosmos.slashing.v1beta1.MsgUnjail", ld(1, WALLET))])
+    unknown = tx_raw([any_("/foo.v1.MsgUnknown", b"")])
+    # seconds far past year 9999
+    bad_time = tx_raw([any_("/cosmos.authz.v1beta1.MsgGrant", ld(3, ld(2, vi(1, 2**62))))])
+    deep = ld(2, b"")
+    for _ in range(2_000):
+        deep = ld(2, any_("/cosmos.authz.v1beta1.MsgExec", deep))
+    too_deep = tx_raw([any_("/cosmos.authz.v1beta1.MsgExec", deep)])
+
+    fallback = RecordingDecoder()
+    values = PythonDecoder(fallback).decode(
+        [{"id": 1, "tx": good}, {"id": 2, "tx": unknown}, {"id": 3, "tx": bad_time}, {"id": 4, "tx": too_deep}, {"id": 5, "tx": "not base64!"}]
+    )
+
+    assert fallback.seen == [2, 3, 4, 5]
+    assert [v["id"] for v in values] == [1, 2, 3, 4, 5]
+    assert values[0]["tx"]["body"]["messages"] == [{"@type": "/cosmos.slashing.v1beta1.MsgUnjail", "validator_addr": WALLET}]
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+pytest.importorskip("psycopg2")
+
+from SQL import TX_HOT_COLUMNS, Database
+
+
+def test_hot_columns_tx_loads_tx_amino_lazily():
+    db = Database.__new__(Database)
+    loaded = []
+
+    def get_tx_amino(tx_id: int) -> str:
+        loaded.append(tx_id)
+        return "CpIBCo8B"
+
+    db.get_tx_amino = get_tx_amino
+    row = {"id": 7, "height": 100, "msg_types": "[]", "tx_json": "{}", "address": "juno1abc", "tx_hash": "AB"}
+    tx = db._tx([row[c] for c in TX_HOT_COLUMNS])
+
+    assert tx.raw_amino is None
+    assert loaded == []
+    assert tx.tx_amino == "CpIBCo8B"
+    assert tx.tx_amino == "CpIBCo8B"
+    assert loaded == [7]
+
+
+def test_selected_tx_amino_skips_the_loader():
+    db = Database.__new__(Database)
+    db.get_tx_amino = lambda tx_id: pytest.fail("loader called")
+    tx = db._tx([1, 2, "CpIB"], ["id", "height", "tx_amino"])
+
+    assert tx.tx_amino == "CpIB"
+    assert tx.tx_hash == ""
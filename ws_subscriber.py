@@ -0,0 +1,45 @@
+import asyncio
+import json
+from typing import AsyncIterator
+
+from block_parser import loads
+
+try:
+    # optional, only needed to follow the chain tip over /websocket (pip install websockets)
+    import websockets
+except ImportError:
+    websockets = None
+
+NEW_BLOCK_QUERY = "tm.event='NewBlock'"
+
+
+def websocket_url(rpc_url: str) -> str:
+    """https://rpc.example.com:443 -> wss://rpc.example.com:443/websocket"""
+    url = rpc_url.rstrip("/")
+    if url.startswith("https://"):
+        url = "wss://" + url[len("https://") :]
+    elif url.startswith("http://"):
+        url = "ws://" + url[len("http://") :]
+    return f"{url}/websocket"
+
+
+async def subscribe_new_blocks(url: str, idle_timeout: float = 60) -> AsyncIterator[dict]:
+    """
+    Yields the `block` of every CometBFT NewBlock event (same shape as /block result.block).
+    Raises on disconnect, on a subscription error or when no event arrives within
+    idle_timeout seconds, the caller is expected to backfill & reconnect.
+    """
+    if websockets is None:
+        raise ImportError("Following the chain tip needs websockets: pip install websockets")
+
+    async with websockets.connect(url, max_size=None, ping_interval=20, ping_timeout=20) as ws:
+        await ws.send(json.dumps({"jsonrpc": "2.0", "method": "subscribe", "id": 1, "params": {"query": NEW_BLOCK_QUERY}}))
+        while True:
+            message = await asyncio.wait_for(ws.recv(), timeout=idle_timeout)
+            data = loads(message)
+            if "error" in data:
+                raise RuntimeError(f"subscribe error: {data['error']}")
+
+            block = data.get("result", {}).get("data", {}).get("value", {}).get("block")
+            if block is not None:
+                yield block